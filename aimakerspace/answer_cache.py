@@ -0,0 +1,168 @@
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+class _Entry:
+    __slots__ = ("key", "question", "embedding", "answer", "scope", "documents", "expires_at")
+
+    def __init__(self, key, question, embedding, answer, scope, documents, expires_at):
+        self.key = key
+        self.question = question
+        self.embedding = embedding
+        self.answer = answer
+        self.scope = scope
+        self.documents = documents
+        self.expires_at = expires_at
+
+
+class AnswerCache:
+    """LRU cache of completed answers, matched by question similarity.
+
+    Entries are grouped under an exact key, e.g. ``(tenant, analysis type,
+    model, context_hash(retrieved chunks))``. Within a group, a lookup returns
+    the answer whose question embedding is most similar to the new one if
+    their cosine similarity reaches ``threshold``. Questions looked up without
+    an embedding only match the same whitespace/case-normalized text.
+
+    Entries expire after ``ttl`` seconds, and the least recently used are
+    evicted beyond ``maxsize``. :meth:`invalidate` drops the entries whose
+    context came from given documents of a scope (e.g. a tenant), so answers
+    are discarded as soon as those documents change.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: Optional[float] = 3600.0, threshold: float = 0.95):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # entry id -> entry, least recent first
+        self._groups: Dict[Hashable, List[int]] = defaultdict(list)  # key -> entry ids
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    @staticmethod
+    def context_hash(chunks: Iterable[Tuple[int, str]]) -> str:
+        """Hash of the retrieved ``(chunk id, chunk text)`` pairs, in rank order."""
+        digest = hashlib.sha256()
+        for chunk_id, text in chunks:
+            digest.update(f"{chunk_id}\0{len(text)}\0".encode("utf-8"))
+            digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        return " ".join(question.split()).casefold()
+
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, key: Hashable, question: str, embedding=None) -> Optional[str]:
+        """The cached answer to the closest question under ``key``, if similar enough."""
+        if not self.enabled:
+            return None
+        query = self._unit(embedding)
+        normalized = self.normalize(question)
+        now = time.monotonic()
+        with self._lock:
+            best, best_score = None, -1.0
+            for entry_id in list(self._groups.get(key, ())):
+                entry = self._entries[entry_id]
+                if entry.expires_at is not None and entry.expires_at <= now:
+                    self._remove(entry_id)
+                    continue
+                if entry.question == normalized:
+                    score = 1.0
+                elif query is not None and entry.embedding is not None:
+                    score = float(entry.embedding @ query)
+                else:
+                    continue
+                if score >= self.threshold and score > best_score:
+                    best, best_score = entry_id, score
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best].answer
+
+    def put(
+        self,
+        key: Hashable,
+        question: str,
+        answer: str,
+        embedding=None,
+        scope: Hashable = None,
+        documents: Iterable[str] = (),
+    ) -> None:
+        """Cache ``answer``; ``scope`` and ``documents`` say which changes invalidate it."""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        entry = _Entry(key, self.normalize(question), self._unit(embedding), answer, scope, set(documents), expires_at)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = entry
+            self._groups[key].append(entry_id)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        group = self._groups[entry.key]
+        group.remove(entry_id)
+        if not group:
+            del self._groups[entry.key]
+
+    def invalidate(self, scope: Hashable, documents: Optional[Iterable[str]] = None) -> int:
+        """Drop ``scope``'s entries built from any of ``documents`` (all of them when ``None``)."""
+        changed: Optional[Set[str]] = set(documents) if documents is not None else None
+        with self._lock:
+            stale = [
+                entry_id for entry_id, entry in self._entries.items()
+                if entry.scope == scope and (changed is None or entry.documents & changed)
+            ]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,143 @@
+import heapq
+import math
+import re
+import sys
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Words, tickers and figures; internal dots, dashes and commas are kept so
+# "10-K", "1,250.5" and "U.S." stay single tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.,\-/'&][a-z0-9]+)*")
+
+# Small queries made only of tokens like these are treated as keyword lookups
+_QUESTION_WORDS = {
+    "what", "why", "how", "when", "where", "which", "who", "whom", "whose",
+    "explain", "describe", "summarize", "summarise", "compare", "analyze",
+    "analyse", "should", "could", "would", "can", "does", "did", "is", "are",
+}
+_KEYWORD_TOKEN = re.compile(r"^(?:[A-Z][A-Z0-9.&\-]{1,9}|\S*\d\S*)$")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).casefold())
+
+
+def is_keyword_query(query: str, max_terms: int = 4) -> bool:
+    """Whether ``query`` looks like an exact-token lookup rather than a question.
+
+    True for short queries without question words that contain a quoted
+    phrase, a ticker/acronym (``AAPL``, ``EBITDA``) or a figure (``2023``,
+    ``$1.2bn``), e.g. ``"EBITDA 2023"`` or ``"10-K AAPL"``.
+    """
+    if '"' in query:
+        return True
+    words = query.strip().rstrip("?").split()
+    if not words or len(words) > max_terms or query.strip().endswith("?"):
+        return False
+    if any(word.casefold().strip(",.:;") in _QUESTION_WORDS for word in words):
+        return False
+    return any(_KEYWORD_TOKEN.match(word.strip(",.:;()")) for word in words)
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over documents identified by integer ids.
+
+    Safe to search from worker threads while documents are added or removed.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)  # term -> id -> term frequency
+        self._lengths: Dict[int, int] = {}  # id -> document length in tokens
+        self._terms: Dict[int, Tuple[str, ...]] = {}  # id -> distinct terms, for removal
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._lengths
+
+    def add(self, doc_id: int, text: str) -> None:
+        self.add_many([doc_id], [text])
+
+    def add_many(self, doc_ids: Iterable[int], texts: Iterable[str]) -> None:
+        # Tokenize outside the lock so searches are only held up by the updates
+        documents = [(doc_id, Counter(tokenize(text))) for doc_id, text in zip(doc_ids, texts)]
+        with self._lock:
+            for doc_id, counts in documents:
+                self._remove(doc_id)
+                for term, count in counts.items():
+                    self._postings[term][doc_id] = count
+                length = sum(counts.values())
+                self._lengths[doc_id] = length
+                self._terms[doc_id] = tuple(counts)
+                self._total_length += length
+
+    def remove(self, doc_ids: Iterable[int]) -> None:
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: int) -> None:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._terms.clear()
+            self._total_length = 0
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the postings and per-document tables."""
+        with self._lock:
+            total = sys.getsizeof(self._postings) + sys.getsizeof(self._lengths) + sys.getsizeof(self._terms)
+            for term, postings in self._postings.items():
+                total += sys.getsizeof(term) + sys.getsizeof(postings)
+            total += sum(map(sys.getsizeof, self._terms.values()))
+        return total
+
+    def idf(self, term: str) -> float:
+        n = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._lengths) - n + 0.5) / (n + 0.5))
+
+    def search(self, query: str, k: int, allowed_ids: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """Top-``k`` ``(doc_id, score)`` pairs, optionally restricted to ``allowed_ids``."""
+        terms = set(tokenize(query))
+        scores: Dict[int, float] = defaultdict(float)
+        with self._lock:
+            if not self._lengths:
+                return []
+            average_length = self._total_length / len(self._lengths)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = self.idf(term)
+                for doc_id, tf in postings.items():
+                    if allowed_ids is not None and doc_id not in allowed_ids:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists: each id scores ``sum(1 / (k + rank))`` over the lists it appears in."""
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
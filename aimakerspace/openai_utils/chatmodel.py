@@ -1,6 +1,6 @@
-from openai import OpenAI
 from dotenv import load_dotenv
 import os
+from .client_pool import default_client_pool
 
 load_dotenv()
 
@@ -16,7 +16,7 @@ class ChatOpenAI:
         if not isinstance(messages, list):
             raise ValueError("messages must be a list")
 
-        client = OpenAI()
+        client = default_client_pool.get_sync(self.openai_api_key)
         response = client.chat.completions.create(
             model=self.model_name, messages=messages, **kwargs
         )
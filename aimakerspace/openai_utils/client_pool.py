@@ -0,0 +1,179 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+Client = Union[OpenAI, AsyncOpenAI]
+
+
+class OpenAIClientPool:
+    """Registry of reusable OpenAI clients, one per API key.
+
+    Constructing a client per request means a new connection pool and TLS
+    handshake every time; pooled clients keep their connections alive
+    between requests. Entries are keyed by a SHA-256 of the API key (async
+    clients also by event loop, since their connections are bound to it),
+    evicted least-recently-used beyond ``max_clients`` or after
+    ``idle_timeout`` seconds unused. Evicted clients are closed only after
+    another ``idle_timeout``, so requests still running on them can finish.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = 64,
+        idle_timeout: float = 300.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: Optional[float] = 600.0,
+    ):
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[tuple, Tuple[Client, float]]" = OrderedDict()  # key -> (client, last used)
+        self._retired: List[Tuple[tuple, Client, float]] = []  # (key, client, retired at)
+
+    @classmethod
+    def from_env(cls) -> "OpenAIClientPool":
+        """Pool configured from the ``OPENAI_CLIENT_*`` / ``OPENAI_*`` environment variables"""
+        return cls(
+            max_clients=int(os.getenv("OPENAI_CLIENT_POOL_SIZE", "64")),
+            idle_timeout=float(os.getenv("OPENAI_CLIENT_IDLE_TIMEOUT", "300")),
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+            keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30")),
+        )
+
+    @staticmethod
+    def key_hash(api_key: Optional[str]) -> str:
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()
+
+    def get_sync(self, api_key: Optional[str] = None) -> OpenAI:
+        """Shared ``OpenAI`` client for ``api_key`` (``OPENAI_API_KEY`` when omitted)."""
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        return self._get(("sync", self.key_hash(api_key), None), lambda: OpenAI(
+            api_key=api_key,
+            timeout=self.timeout,
+            http_client=httpx.Client(limits=self.limits, timeout=self.timeout),
+        ))
+
+    def get_async(self, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """Shared ``AsyncOpenAI`` client for ``api_key`` on the running event loop."""
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        return self._get(("async", self.key_hash(api_key), loop), lambda: AsyncOpenAI(
+            api_key=api_key,
+            timeout=self.timeout,
+            http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout),
+        ))
+
+    def _get(self, key: tuple, create) -> Client:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                self.hits += 1
+                client = entry[0]
+            else:
+                self.misses += 1
+                client = create()
+            self._clients[key] = (client, now)
+            self._clients.move_to_end(key)
+            due = self._evict(now)
+        for retired_key, retired in due:
+            self._close(retired_key, retired)
+        return client
+
+    def _evict(self, now: float) -> List[Tuple[tuple, Client]]:
+        """Retire idle and over-capacity clients; return retired ones due for closing"""
+        # Async clients of a finished event loop (e.g. after asyncio.run) are unusable
+        for key in [key for key in self._clients if key[2] is not None and key[2].is_closed()]:
+            del self._clients[key]
+        while self._clients:
+            key, (client, last_used) = next(iter(self._clients.items()))
+            if len(self._clients) <= self.max_clients and now - last_used <= self.idle_timeout:
+                break
+            del self._clients[key]
+            self._retired.append((key, client, now))
+            self.evictions += 1
+        due = [(key, client) for key, client, retired_at in self._retired if now - retired_at > self.idle_timeout]
+        if due:
+            self._retired = [entry for entry in self._retired if now - entry[2] <= self.idle_timeout]
+        return due
+
+    @staticmethod
+    def _close(key: tuple, client: Client) -> None:
+        if isinstance(client, OpenAI):
+            client.close()
+            return
+        loop = key[2]
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is running:
+            loop.create_task(client.close())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+
+    def _drain(self) -> List[Tuple[tuple, Client]]:
+        with self._lock:
+            entries = [(key, client) for key, (client, _) in self._clients.items()]
+            entries += [(key, client) for key, client, _ in self._retired]
+            self._clients.clear()
+            self._retired.clear()
+        return entries
+
+    def close_all(self) -> None:
+        """Close every pooled and retired client, e.g. on application shutdown"""
+        for key, client in self._drain():
+            self._close(key, client)
+
+    async def aclose_all(self) -> None:
+        """``close_all`` from within an event loop, awaiting its async clients' shutdown"""
+        loop = asyncio.get_running_loop()
+        for key, client in self._drain():
+            if isinstance(client, AsyncOpenAI) and key[2] is loop:
+                await client.close()
+            else:
+                self._close(key, client)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "clients": len(self._clients),
+            "retired": len(self._retired),
+            "max_clients": self.max_clients,
+            "idle_timeout": self.idle_timeout,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Process-wide pool shared by ChatOpenAI, EmbeddingModel and the API handlers
+default_client_pool = OpenAIClientPool.from_env()
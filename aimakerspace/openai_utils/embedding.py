@@ -1,17 +1,116 @@
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, OpenAI
 import openai
-from typing import List
+from collections import OrderedDict
+from typing import List, Optional
 import os
 import asyncio
+import random
+import threading
+import time
+from .client_pool import OpenAIClientPool, default_client_pool
+from .embedding_cache import PersistentEmbeddingCache
+
+
+class QueryEmbeddingCache:
+    """In-process LRU cache of single-text embeddings with an optional TTL.
+
+    Keys are ``(model name, normalized text)`` where normalization collapses
+    whitespace and case, so trivially different phrasings of the same query
+    share an entry.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None, enabled: bool = True):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, embedding)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split()).casefold()
+
+    def get(self, model_name: str, text: str) -> Optional[List[float]]:
+        if not self.enabled or self.maxsize <= 0:
+            return None
+        key = (model_name, self.normalize(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, text: str, embedding: List[float]) -> None:
+        if not self.enabled or self.maxsize <= 0:
+            return
+        key = (model_name, self.normalize(text))
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Errors worth retrying with backoff; anything else fails the call immediately
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
 
 
 class EmbeddingModel:
-    def __init__(self, embeddings_model_name: str = "text-embedding-3-small", api_key: str = None):
+    def __init__(
+        self,
+        embeddings_model_name: str = "text-embedding-3-small",
+        api_key: str = None,
+        query_cache_size: int = 1024,
+        query_cache_ttl: Optional[float] = None,
+        cache_path: Optional[str] = None,
+        max_batch_tokens: int = 250_000,
+        max_batch_size: int = 2048,
+        max_concurrency: int = 4,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        client_pool: Optional[OpenAIClientPool] = None,
+    ):
         load_dotenv()
         self.openai_api_key = api_key or os.getenv("OPENAI_API_KEY")
-        self.async_client = AsyncOpenAI(api_key=self.openai_api_key)
-        self.client = OpenAI(api_key=self.openai_api_key)
+        # Clients come from a shared pool so connections are reused across
+        # models and requests with the same key
+        self.client_pool = client_pool or default_client_pool
 
         if self.openai_api_key is None:
             raise ValueError(
@@ -19,31 +118,159 @@ class EmbeddingModel:
             )
         openai.api_key = self.openai_api_key
         self.embeddings_model_name = embeddings_model_name
+        # Single-text lookups (i.e. search queries) go through this cache;
+        # set query_cache.enabled = False to bypass it at runtime
+        self.query_cache = QueryEmbeddingCache(query_cache_size, query_cache_ttl)
+        # Batch (ingestion) embeddings are looked up in an on-disk,
+        # content-addressed cache first when a path is configured
+        cache_path = cache_path or os.getenv("EMBEDDING_CACHE_PATH")
+        self.persistent_cache = PersistentEmbeddingCache(cache_path) if cache_path else None
+        # Bulk embedding scheduler: batches are packed up to max_batch_tokens
+        # (estimated) and max_batch_size inputs, at most max_concurrency are
+        # in flight, and rate-limit/transient errors are retried with backoff
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
 
-    async def async_get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
-        batch_size = 1024
-        batches = [list_of_text[i:i + batch_size] for i in range(0, len(list_of_text), batch_size)]
-        
-        async def process_batch(batch):
-            embedding_response = await self.async_client.embeddings.create(
-                input=batch, model=self.embeddings_model_name
+    @property
+    def client(self) -> OpenAI:
+        return self.client_pool.get_sync(self.openai_api_key)
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        return self.client_pool.get_async(self.openai_api_key)
+
+    async def async_get_embeddings(
+        self, list_of_text: List[str], batch_stats: Optional[List[dict]] = None
+    ) -> List[List[float]]:
+        """Embed ``list_of_text``; per-request stats of this call are appended to ``batch_stats`` if given."""
+        if self.persistent_cache is None:
+            return await self._async_fetch_embeddings(list_of_text, batch_stats)
+
+        cached = await asyncio.to_thread(
+            self.persistent_cache.get_many, self.embeddings_model_name, list_of_text
+        )
+        misses = list(dict.fromkeys(text for text, hit in zip(list_of_text, cached) if hit is None))
+        if misses:
+            fetched = await self._async_fetch_embeddings(misses, batch_stats)
+            await asyncio.to_thread(
+                self.persistent_cache.put_many, self.embeddings_model_name, misses, fetched
             )
-            return [embeddings.embedding for embeddings in embedding_response.data]
+            fetched_by_text = dict(zip(misses, fetched))
+            cached = [hit if hit is not None else fetched_by_text[text] for text, hit in zip(list_of_text, cached)]
+        return cached
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap, deliberately high token estimate.
+
+        English prose averages ~4 characters per token, but filings dense with
+        figures and tables get down to 2-3, and a batch over the API's
+        per-request token limit fails without a retry, so assume 2.
+        """
+        return len(text) // 2 + 1
+
+    def _pack_batches(self, list_of_text: List[str]) -> List[List[str]]:
+        """Greedily pack texts, in order, into batches under the token and size limits."""
+        batches, batch, batch_tokens = [], [], 0
+        for text in list_of_text:
+            tokens = self.estimate_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retry ``attempt``: Retry-After if given, else jittered backoff."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        retry_after = None
+        try:
+            if headers.get("retry-after-ms") is not None:
+                retry_after = float(headers["retry-after-ms"]) / 1000
+            elif headers.get("retry-after") is not None:
+                retry_after = float(headers["retry-after"])
+        except ValueError:
+            retry_after = None
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 0.1 * retry_after + 0.1)
+        # "Full jitter" exponential backoff
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * 2 ** attempt))
+
+    async def _async_fetch_embeddings(
+        self, list_of_text: List[str], batch_stats: Optional[List[dict]] = None
+    ) -> List[List[float]]:
+        batches = self._pack_batches(list_of_text)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # The scheduler owns retries and backoff (honouring Retry-After), so
+        # the SDK's own retries are turned off rather than multiplied
+        client = self.async_client.with_options(max_retries=0)
+        stats = []
+        
+        async def process_batch(number, batch):
+            async with semaphore:
+                for attempt in range(self.max_retries + 1):
+                    started = time.perf_counter()
+                    try:
+                        embedding_response = await client.embeddings.create(
+                            input=batch, model=self.embeddings_model_name
+                        )
+                    except RETRYABLE_ERRORS as e:
+                        if attempt == self.max_retries:
+                            raise
+                        await asyncio.sleep(self._retry_delay(e, attempt))
+                        continue
+                    stats.append({
+                        "batch": number,
+                        "inputs": len(batch),
+                        "estimated_tokens": sum(self.estimate_tokens(text) for text in batch),
+                        "attempts": attempt + 1,
+                        "latency_s": time.perf_counter() - started,
+                    })
+                    return [embeddings.embedding for embeddings in embedding_response.data]
         
-        # Use asyncio.gather to process all batches concurrently
-        results = await asyncio.gather(*[process_batch(batch) for batch in batches])
+        # Batches run concurrently, but never more than max_concurrency at once
+        results = await asyncio.gather(*[process_batch(i, batch) for i, batch in enumerate(batches)])
+        if batch_stats is not None:
+            batch_stats.extend(sorted(stats, key=lambda s: s["batch"]))
         
         # Flatten the results
         return [embedding for batch_result in results for embedding in batch_result]
 
     async def async_get_embedding(self, text: str) -> List[float]:
+        cached = self.query_cache.get(self.embeddings_model_name, text)
+        if cached is not None:
+            return cached
+
         embedding = await self.async_client.embeddings.create(
             input=text, model=self.embeddings_model_name
         )
 
-        return embedding.data[0].embedding
+        result = embedding.data[0].embedding
+        self.query_cache.put(self.embeddings_model_name, text, result)
+        return result
 
     def get_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
+        if self.persistent_cache is None:
+            return self._fetch_embeddings(list_of_text)
+
+        cached = self.persistent_cache.get_many(self.embeddings_model_name, list_of_text)
+        misses = list(dict.fromkeys(text for text, hit in zip(list_of_text, cached) if hit is None))
+        if misses:
+            fetched = self._fetch_embeddings(misses)
+            self.persistent_cache.put_many(self.embeddings_model_name, misses, fetched)
+            fetched_by_text = dict(zip(misses, fetched))
+            cached = [hit if hit is not None else fetched_by_text[text] for text, hit in zip(list_of_text, cached)]
+        return cached
+
+    def _fetch_embeddings(self, list_of_text: List[str]) -> List[List[float]]:
         embedding_response = self.client.embeddings.create(
             input=list_of_text, model=self.embeddings_model_name
         )
@@ -51,11 +278,17 @@ class EmbeddingModel:
         return [embeddings.embedding for embeddings in embedding_response.data]
 
     def get_embedding(self, text: str) -> List[float]:
+        cached = self.query_cache.get(self.embeddings_model_name, text)
+        if cached is not None:
+            return cached
+
         embedding = self.client.embeddings.create(
             input=text, model=self.embeddings_model_name
         )
 
-        return embedding.data[0].embedding
+        result = embedding.data[0].embedding
+        self.query_cache.put(self.embeddings_model_name, text, result)
+        return result
 
 
 if __name__ == "__main__":
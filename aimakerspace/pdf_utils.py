@@ -1,41 +1,202 @@
 import PyPDF2
 import os
-from typing import List, Optional
-from .text_utils import CharacterTextSplitter
+import json
+import asyncio
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Union
+from .bm25 import BM25Index, is_keyword_query, reciprocal_rank_fusion
+from .text_utils import CharacterTextSplitter, Chunk, MinHashDeduplicator, content_hash
+from .vectordatabase import VectorDatabase
 import io
 
+DOCUMENTS_FILENAME = "documents.json"
+
+# (digest, reader) of the last PDF parsed in an extraction worker process, so
+# a worker handed several page ranges of one upload parses it only once
+_worker_reader = None
+
+
+def _extract_page_range(digest: bytes, pdf_path: str, start: int, stop: int) -> List[str]:
+    global _worker_reader
+    if _worker_reader is None or _worker_reader[0] != digest:
+        with open(pdf_path, 'rb') as file:
+            _worker_reader = (digest, PyPDF2.PdfReader(io.BytesIO(file.read())))
+    reader = _worker_reader[1]
+    return [reader.pages[i].extract_text() + "\n" for i in range(start, stop)]
+
 
 class PDFLoader:
     """Utility class for loading and processing PDF files."""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        workers: int = 1,
+        pages_per_task: int = 8,
+        boundary: Optional[str] = None,
+    ):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = CharacterTextSplitter(chunk_size, chunk_overlap)
+        # boundary="sentence"/"paragraph" keeps chunk edges stable under
+        # edits, which lets re-indexing a revised document reuse most chunks
+        self.text_splitter = CharacterTextSplitter(chunk_size, chunk_overlap, boundary)
+        # With workers > 1, page text is extracted in that many processes,
+        # pages_per_task pages at a time. The process pool is started on first
+        # use and shared by every upload until close()
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # Forking a multi-threaded server process is unsafe, so workers
+                # are started from a fork server (or spawned where there is none)
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    # Import the extraction code once in the server rather than in every worker
+                    context.set_forkserver_preload(["aimakerspace.pdf_utils"])
+                else:
+                    context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+            return self._executor
+    
+    def close(self) -> None:
+        """Shut down the extraction process pool, if one was started."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
     
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract text content from a PDF file."""
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+            return "".join(text for _, text in self.iter_pages(pdf_path))
         except Exception as e:
             raise ValueError(f"Error extracting text from PDF: {str(e)}")
     
     def extract_text_from_pdf_bytes(self, pdf_bytes: bytes) -> str:
         """Extract text content from PDF bytes."""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            return "".join(text for _, text in self.iter_pages(pdf_bytes))
         except Exception as e:
             raise ValueError(f"Error extracting text from PDF bytes: {str(e)}")
     
+    def count_pages(self, source: Union[str, bytes]) -> int:
+        """Number of pages in a PDF path or PDF bytes."""
+        if isinstance(source, (bytes, bytearray)):
+            return len(PyPDF2.PdfReader(io.BytesIO(source)).pages)
+        with open(source, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    
+    def iter_pages(self, source: Union[str, bytes]) -> Iterator[Tuple[int, str]]:
+        """Yield ``(page_number, text)`` for each page of a PDF path or PDF bytes.
+
+        Page numbers start at 1; each page's text ends with a newline, as in
+        :meth:`extract_text_from_pdf`. With ``workers > 1`` pages are
+        extracted in parallel and still yielded in order.
+        """
+        if self.workers > 1:
+            yield from self._iter_pages_parallel(source)
+        elif isinstance(source, (bytes, bytearray)):
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(source))
+            for number, page in enumerate(pdf_reader.pages, start=1):
+                yield number, page.extract_text() + "\n"
+        else:
+            with open(source, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                for number, page in enumerate(pdf_reader.pages, start=1):
+                    yield number, page.extract_text() + "\n"
+    
+    def _iter_pages_parallel(self, source: Union[str, bytes]) -> Iterator[Tuple[int, str]]:
+        if not isinstance(source, (bytes, bytearray)):
+            with open(source, 'rb') as file:
+                source = file.read()
+        n_pages = self.count_pages(source)
+        ranges = [(start, min(start + self.pages_per_task, n_pages)) for start in range(0, n_pages, self.pages_per_task)]
+        workers = min(self.workers, len(ranges))
+        if workers < 2:
+            # Not enough pages to be worth starting processes for
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(source))
+            for number, page in enumerate(pdf_reader.pages, start=1):
+                yield number, page.extract_text() + "\n"
+            return
+        
+        executor = self._get_executor()
+        digest = hashlib.sha256(source).digest()
+        # Workers read the PDF from a temporary file, so tasks carry only its
+        # path instead of a pickled copy of the bytes each
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as file:
+            file.write(source)
+            pdf_path = file.name
+        # Keep only a couple of ranges per worker in flight so extracted
+        # text does not pile up ahead of a slow consumer
+        pending, remaining = deque(), iter(ranges)
+        try:
+            for start, stop in remaining:
+                pending.append((start, executor.submit(_extract_page_range, digest, pdf_path, start, stop)))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                start, future = pending.popleft()
+                texts = future.result()
+                for next_start, next_stop in remaining:
+                    pending.append((next_start, executor.submit(_extract_page_range, digest, pdf_path, next_start, next_stop)))
+                    break
+                for offset, text in enumerate(texts):
+                    yield start + offset + 1, text
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            with self._executor_lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            for _, future in pending:
+                future.cancel()
+            os.remove(pdf_path)
+    
+    def iter_chunks(self, source: Union[str, bytes]) -> Iterator[Tuple[str, dict]]:
+        """Yield ``(chunk, metadata)`` pairs as pages are parsed.
+
+        Chunks are the same as ``process_pdf``'s, including those spanning a
+        page break; ``metadata`` records the first and last page each chunk
+        covers. Only the current page and one chunk of carry-over text are
+        held in memory.
+        """
+        return self._chunk_pages(self.iter_pages(source))
+    
+    def _chunk_pages(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, dict]]:
+        page_starts, page_numbers = [], []  # pages still overlapping unemitted text
+        
+        def texts():
+            offset = 0
+            for number, text in pages:
+                page_starts.append(offset)
+                page_numbers.append(number)
+                offset += len(text)
+                yield text
+        
+        for start, chunk in self.text_splitter.split_stream(texts()):
+            end = start + max(len(chunk), 1) - 1
+            first = bisect_right(page_starts, start) - 1
+            last = bisect_right(page_starts, end) - 1
+            yield chunk, {"page_start": page_numbers[first], "page_end": page_numbers[last]}
+            # Forget pages that end before this chunk; later chunks start further on
+            if first > 0:
+                del page_starts[:first]
+                del page_numbers[:first]
+    
     def process_pdf(self, pdf_path: str) -> List[str]:
         """Process a PDF file and return text chunks."""
         text = self.extract_text_from_pdf(pdf_path)
@@ -47,96 +208,455 @@ class PDFLoader:
         return self.text_splitter.split(text)
 
 
+def _count_pages(pages: Iterator[Tuple[int, str]], progress: dict) -> Iterator[Tuple[int, str]]:
+    for number, text in pages:
+        progress["pages_parsed"] = number
+        yield number, text
+
+
+async def _iterate(iterable: Iterable) -> AsyncIterator:
+    for item in iterable:
+        yield item
+
+
+async def _iterate_in_thread(iterator: Iterator) -> AsyncIterator:
+    """Consume a blocking iterator from a worker thread, one item at a time."""
+    loop = asyncio.get_running_loop()
+    done = object()
+    step = None
+    try:
+        while True:
+            step = loop.run_in_executor(None, next, iterator, done)
+            # Shielded so that on cancellation the thread's current step can
+            # finish before the iterator is closed
+            item = await asyncio.shield(step)
+            if item is done:
+                return
+            yield item
+    finally:
+        if step is not None and not step.done():
+            await asyncio.wait([step])
+        if hasattr(iterator, "close"):
+            await loop.run_in_executor(None, iterator.close)
+
+
 class PDFIndexer:
     """Class for indexing PDF content using the vector database."""
     
-    def __init__(self, vector_db, pdf_loader: Optional[PDFLoader] = None):
+    def __init__(
+        self,
+        vector_db,
+        pdf_loader: Optional[PDFLoader] = None,
+        dedup: bool = True,
+        near_duplicate_threshold: Optional[float] = None,
+        batch_size: int = 256,
+        lexical: bool = True,
+        hybrid_candidates: int = 50,
+        rrf_k: int = 60,
+    ):
         self.vector_db = vector_db
         self.pdf_loader = pdf_loader or PDFLoader()
         self.indexed_documents = {}  # Store document metadata
+        # Identical (whitespace-normalized) chunks are embedded and stored
+        # once per document; set a threshold to also fold near-duplicates
+        self.dedup = dedup
+        self.near_duplicate_threshold = near_duplicate_threshold
+        # Chunks are embedded and inserted this many at a time while the
+        # source is still being read
+        self.batch_size = batch_size
+        self._document_locks = {}  # document name -> lock serializing its (re)indexing
+        # BM25 index over the same row ids as vector_db, for exact-token
+        # matches (tickers, line items, figures) and embedding-free lookups.
+        # Hybrid search fuses the top hybrid_candidates of each ranking.
+        self.lexical_index = BM25Index() if lexical else None
+        self.hybrid_candidates = hybrid_candidates
+        self.rrf_k = rrf_k
     
-    async def index_pdf(self, pdf_bytes: bytes, document_name: str) -> dict:
-        """Index a PDF document and return indexing results."""
+    async def index_pdf(
+        self,
+        pdf_bytes: bytes,
+        document_name: str,
+        progress: Optional[dict] = None,
+        reindex: bool = False,
+    ) -> dict:
+        """Index a PDF document and return indexing results.
+
+        If ``progress`` is given it is updated in place as indexing proceeds
+        (``pages_total``, ``pages_parsed`` and the counters described in
+        :meth:`_index_stream`). With ``reindex=True`` the PDF is treated as a
+        new version of ``document_name`` and only its changed chunks are
+        embedded (see :meth:`_index_stream`).
+        """
         try:
-            # Extract and chunk the PDF text
-            chunks = self.pdf_loader.process_pdf_bytes(pdf_bytes)
-            
-            if not chunks:
-                raise ValueError("No text content could be extracted from the PDF")
-            
-            # Create metadata for each chunk
-            metadata_list = []
-            for i, chunk in enumerate(chunks):
-                metadata = {
-                    "document_name": document_name,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "chunk_size": len(chunk)
-                }
-                metadata_list.append(metadata)
-            
-            # Build the vector database from chunks
-            await self.vector_db.abuild_from_list(chunks, metadata_list)
-            
-            # Store document info
-            self.indexed_documents[document_name] = {
-                "chunks": len(chunks),
-                "total_text_length": sum(len(chunk) for chunk in chunks)
-            }
-            
-            return {
-                "document_name": document_name,
-                "chunks_created": len(chunks),
-                "total_text_length": sum(len(chunk) for chunk in chunks),
-                "status": "success"
-            }
+            pages = self.pdf_loader.iter_pages(pdf_bytes)
+            if progress is not None:
+                progress["pages_total"] = await asyncio.to_thread(self.pdf_loader.count_pages, pdf_bytes)
+                pages = _count_pages(pages, progress)
+            # Chunks are embedded batch by batch while later pages are still
+            # being parsed, so memory does not grow with document size.
+            # Parsing runs in a thread to keep the event loop responsive.
+            chunks = _iterate_in_thread(self.pdf_loader._chunk_pages(pages))
+            return await self._index_stream(chunks, document_name, reindex, progress)
             
         except Exception as e:
             raise ValueError(f"Error indexing PDF: {str(e)}")
     
-    async def index_text(self, text_content: str, document_name: str) -> dict:
-        """Index text content and return indexing results."""
+    async def index_text(
+        self,
+        text_content: str,
+        document_name: str,
+        progress: Optional[dict] = None,
+        reindex: bool = False,
+    ) -> dict:
+        """Index text content and return indexing results (see ``index_pdf`` for the options)."""
         try:
-            # Chunk the text content
-            chunks = self.pdf_loader.text_splitter.split(text_content)
+            # Chunk the text content; chunks are offsets into text_content
+            # rather than copies of it
+            chunks = self.pdf_loader.text_splitter.split_chunks(text_content, document_name)
             
             if not chunks:
                 raise ValueError("No text content could be processed")
             
-            # Create metadata for each chunk
-            metadata_list = []
-            for i, chunk in enumerate(chunks):
-                metadata = {
-                    "document_name": document_name,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "chunk_size": len(chunk)
-                }
-                metadata_list.append(metadata)
-            
-            # Build the vector database from chunks
-            await self.vector_db.abuild_from_list(chunks, metadata_list)
-            
-            # Store document info
-            self.indexed_documents[document_name] = {
-                "chunks": len(chunks),
-                "total_text_length": sum(len(chunk) for chunk in chunks)
-            }
-            
-            return {
-                "document_name": document_name,
-                "chunks_created": len(chunks),
-                "total_text_length": sum(len(chunk) for chunk in chunks),
-                "status": "success"
-            }
+            return await self._index_chunks(chunks, document_name, reindex, progress)
             
         except Exception as e:
             raise ValueError(f"Error indexing text: {str(e)}")
     
-    def search_documents(self, query: str, k: int = 5) -> List[tuple]:
-        """Search indexed documents for relevant content."""
-        return self.vector_db.search_by_text(query, k)
+    async def index_chunk_stream(
+        self,
+        chunk_stream: Iterable[Tuple[str, dict]],
+        document_name: str,
+        progress: Optional[dict] = None,
+        reindex: bool = False,
+    ) -> dict:
+        """Index ``(chunk, metadata)`` pairs produced by a blocking iterator, e.g. rows of a table.
+
+        The iterator is advanced in a worker thread, so parsing overlaps with
+        embedding without blocking the event loop. Chunk metadata is stored
+        with each chunk (see ``index_pdf`` for the options).
+        """
+        try:
+            return await self._index_stream(_iterate_in_thread(iter(chunk_stream)), document_name, reindex, progress)
+        except Exception as e:
+            raise ValueError(f"Error indexing chunks: {str(e)}")
+    
+    async def _index_chunks(
+        self,
+        chunks: List[Union[str, Chunk]],
+        document_name: str,
+        replace: bool = False,
+        progress: Optional[dict] = None,
+    ) -> dict:
+        """Embed ``chunks`` and store them under ``document_name``."""
+        return await self._index_stream(((chunk, {}) for chunk in chunks), document_name, replace, progress)
+    
+    async def _index_stream(
+        self,
+        chunk_stream: Union[Iterable[Tuple[str, dict]], AsyncIterator[Tuple[str, dict]]],
+        document_name: str,
+        replace: bool = False,
+        progress: Optional[dict] = None,
+    ) -> dict:
+        """Embed and store ``(chunk, metadata)`` pairs in batches of ``batch_size``.
+
+        Duplicate chunks are stored once with every source location recorded
+        (see ``dedup``). With ``replace=True`` the chunks are diffed against
+        the document's stored version by content hash: rows of unchanged
+        chunks are kept, only new or changed chunks are embedded and
+        inserted, and rows of chunks that are gone are deleted once the new
+        version is fully indexed. If indexing fails, the new rows are
+        removed and the stored version is left as it was.
+
+        ``progress``, if given, has ``chunks_created``, ``chunks_embedded``
+        and ``chunks_stored`` kept up to date after every batch.
+        """
+        # Two versions of one document must not be diffed against each other concurrently
+        lock = self._document_locks.setdefault(document_name, asyncio.Lock())
+        async with lock:
+            return await self._write_document(chunk_stream, document_name, replace, progress)
+    
+    async def _write_document(
+        self,
+        chunk_stream: Union[Iterable[Tuple[str, dict]], AsyncIterator[Tuple[str, dict]]],
+        document_name: str,
+        replace: bool,
+        progress: Optional[dict],
+    ) -> dict:
+        old_rows = {}  # content hash -> stored row ids not yet matched to a new chunk
+        if replace:
+            for row_id in self.vector_db.ids_where({"document_name": document_name}):
+                old_rows.setdefault(self.vector_db.get_metadata(row_id)["content_hash"], []).append(row_id)
+        kept = {}  # stored row id -> (chunk in the new version, metadata updates for its new position)
+        row_for_hash = {}  # content hash -> row id stored for this document
+        sources = {}  # row id -> source locations, flushed into metadata at the end
+        deduplicator = MinHashDeduplicator(self.near_duplicate_threshold) if self.dedup and self.near_duplicate_threshold is not None else None
+        new_ids, embedded, total_chunks, total_length = [], 0, 0, 0
+        batch = []  # (chunk, metadata, sources) for rows not yet inserted
+        pending = {}  # content hash -> position in batch
+        
+        async def flush():
+            nonlocal embedded
+            # Reuse vectors already stored for the same content (e.g. the
+            # previous version of this document); only embed what is new
+            embeddings = [self._stored_vector(metadata["content_hash"]) for _, metadata, _ in batch]
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                fetched = await self.vector_db.embedding_model.async_get_embeddings([str(batch[i][0]) for i in missing])
+                for i, embedding in zip(missing, fetched):
+                    embeddings[i] = embedding
+            embedded += len(missing)
+            ids = self.vector_db.insert_many([chunk for chunk, _, _ in batch], embeddings, [metadata for _, metadata, _ in batch])
+            if self.lexical_index is not None:
+                self.lexical_index.add_many(ids, [str(chunk) for chunk, _, _ in batch])
+            for row_id, (_, metadata, chunk_sources) in zip(ids, batch):
+                row_for_hash[metadata["content_hash"]] = row_id
+                sources[row_id] = chunk_sources
+            new_ids.extend(ids)
+            batch.clear()
+            pending.clear()
+            progress.update(chunks_embedded=embedded, chunks_stored=len(new_ids))
+        
+        if progress is None:
+            progress = {}
+        progress.update(chunks_created=0, chunks_embedded=0, chunks_stored=0)
+        if not hasattr(chunk_stream, "__aiter__"):
+            chunk_stream = _iterate(chunk_stream)
+        
+        try:
+            chunk_index = -1
+            async for chunk, chunk_metadata in chunk_stream:
+                chunk_index += 1
+                total_chunks += 1
+                progress["chunks_created"] = total_chunks
+                total_length += len(chunk)
+                source = {"document_name": document_name, "chunk_index": chunk_index, **chunk_metadata}
+                chunk_hash = content_hash(chunk)
+                if self.dedup:
+                    if deduplicator is not None and chunk_hash not in row_for_hash and chunk_hash not in pending:
+                        if chunk_hash in old_rows:
+                            deduplicator.add(chunk_hash, chunk)
+                        else:
+                            chunk_hash = deduplicator.add(chunk_hash, chunk) or chunk_hash
+                    if chunk_hash in pending:
+                        batch[pending[chunk_hash]][2].append(source)
+                        continue
+                    if chunk_hash in row_for_hash:
+                        sources[row_for_hash[chunk_hash]].append(source)
+                        continue
+                metadata = {
+                    "document_name": document_name,
+                    "chunk_index": chunk_index,
+                    "chunk_size": len(chunk),
+                    "content_hash": chunk_hash,
+                    **chunk_metadata
+                }
+                if old_rows.get(chunk_hash):
+                    # Unchanged since the stored version: keep its row
+                    row_id = old_rows[chunk_hash].pop()
+                    row_for_hash[chunk_hash] = row_id
+                    sources[row_id] = [source]
+                    kept[row_id] = (chunk, metadata)
+                    continue
+                if self.dedup:
+                    pending[chunk_hash] = len(batch)
+                batch.append((chunk, metadata, [source]))
+                if len(batch) >= self.batch_size:
+                    await flush()
+            if batch:
+                await flush()
+            if total_chunks == 0:
+                raise ValueError("No text content could be processed")
+        except BaseException:
+            self._delete_rows(new_ids)
+            raise
+        
+        for row_id in new_ids:
+            self.vector_db.update_metadata(row_id, {"total_chunks": total_chunks, "sources": sources[row_id]})
+        for row_id, (chunk, metadata) in kept.items():
+            # Chunk keys point into their version's text, so kept rows are
+            # moved onto the new version's buffer and the old one can be freed
+            self.vector_db.update_key(row_id, chunk)
+            self.vector_db.update_metadata(row_id, {**metadata, "total_chunks": total_chunks, "sources": sources[row_id]})
+        removed = [row_id for row_ids in old_rows.values() for row_id in row_ids]
+        self._delete_rows(removed)
+        
+        # Store document info
+        self.indexed_documents[document_name] = {
+            "chunks": total_chunks,
+            "unique_chunks": len(new_ids) + len(kept),
+            "total_text_length": total_length
+        }
+        
+        return {
+            "document_name": document_name,
+            "chunks_created": total_chunks,
+            "unique_chunks": len(new_ids) + len(kept),
+            "chunks_embedded": embedded,
+            "chunks_kept": len(kept),
+            "chunks_added": len(new_ids),
+            "chunks_removed": len(removed),
+            "total_text_length": total_length,
+            "status": "success"
+        }
+    
+    def _stored_vector(self, chunk_hash: str):
+        """A vector already in the index for content with this hash, if any."""
+        ids = self.vector_db.ids_where({"content_hash": chunk_hash})
+        return self.vector_db.get(ids[0])[1] if ids else None
+    
+    async def upsert_document(self, document_name: str, chunks: List[str]) -> dict:
+        """Replace the stored chunks of ``document_name`` (or add it if new)."""
+        if not chunks:
+            raise ValueError("No text content could be processed")
+        return await self._index_chunks(chunks, document_name, replace=True)
+    
+    def delete_document(self, document_name: str) -> int:
+        """Remove a document's chunks from the index; returns the number of chunks removed."""
+        removed = self._delete_rows(self.vector_db.ids_where({"document_name": document_name}))
+        self.indexed_documents.pop(document_name, None)
+        return removed
+    
+    def _delete_rows(self, ids: List[int]) -> int:
+        if self.lexical_index is not None:
+            self.lexical_index.remove(ids)
+        return self.vector_db.delete(ids)
+    
+    def search_documents(
+        self,
+        query: str,
+        k: int = 5,
+        filter: Optional[dict] = None,
+        mode: str = "dense",
+    ) -> List[tuple]:
+        """Search indexed documents for relevant content, optionally filtered by chunk metadata.
+        
+        ``mode`` is one of:
+        
+        - ``"dense"``: embedding similarity (the default)
+        - ``"lexical"``: BM25 only, no embedding call
+        - ``"hybrid"``: dense and BM25 rankings fused with reciprocal rank fusion
+        - ``"auto"``: ``"lexical"`` for keyword lookups such as ``"EBITDA 2023"``
+          when BM25 finds matches, ``"hybrid"`` otherwise
+        
+        Scores are cosine similarities, BM25 scores or fused RRF scores respectively.
+        """
+        mode = self._search_mode(mode)
+        if mode == "dense":
+            return self.vector_db.search_by_text(query, k, filter=filter)
+        lexical = self._lexical_search(query, k, filter)
+        if mode == "lexical" or (mode == "auto" and lexical and is_keyword_query(query)):
+            return self._with_keys(lexical[:k])
+        query_vector = self.vector_db.embedding_model.get_embedding(query)
+        dense = self.vector_db.search_ids(query_vector, max(k, self.hybrid_candidates), filter=filter)
+        return self._with_keys(self._fuse(dense, lexical)[:k])
+    
+    async def asearch_documents(
+        self,
+        query: str,
+        k: int = 5,
+        filter: Optional[dict] = None,
+        mode: str = "dense",
+        with_ids: bool = False,
+    ) -> List[tuple]:
+        """Async variant of :meth:`search_documents` that never blocks the event loop.
+        
+        With ``with_ids=True`` results are ``(row_id, text, score)`` triples.
+        """
+        mode = self._search_mode(mode)
+        if mode == "dense":
+            if not with_ids:
+                return await self.vector_db.asearch_by_text(query, k, filter=filter)
+            return self._with_keys(await self.vector_db.asearch_ids_by_text(query, k, filter=filter), with_ids)
+        if mode == "lexical" or (mode == "auto" and is_keyword_query(query)):
+            lexical = await asyncio.to_thread(self._lexical_search, query, k, filter)
+            if lexical or mode == "lexical":
+                return self._with_keys(lexical[:k], with_ids)
+            dense = await self.vector_db.asearch_ids_by_text(query, max(k, self.hybrid_candidates), filter=filter)
+        else:
+            # Embedding round-trip and BM25 scoring run concurrently
+            dense, lexical = await asyncio.gather(
+                self.vector_db.asearch_ids_by_text(query, max(k, self.hybrid_candidates), filter=filter),
+                asyncio.to_thread(self._lexical_search, query, k, filter),
+            )
+        return self._with_keys(self._fuse(dense, lexical)[:k], with_ids)
+    
+    def _search_mode(self, mode: str) -> str:
+        if mode not in ("dense", "lexical", "hybrid", "auto"):
+            raise ValueError(f"Unknown search mode: {mode}")
+        if self.lexical_index is None:
+            if mode == "lexical":
+                raise ValueError("Lexical search needs an indexer created with lexical=True")
+            return "dense"
+        return mode
+    
+    def _lexical_search(self, query: str, k: int, filter: Optional[dict]) -> List[Tuple[int, float]]:
+        allowed = set(self.vector_db.ids_where(filter)) if filter else None
+        return self.lexical_index.search(query, max(k, self.hybrid_candidates), allowed)
+    
+    def _fuse(self, dense: List[Tuple[int, float]], lexical: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        return reciprocal_rank_fusion([[row_id for row_id, _ in dense], [row_id for row_id, _ in lexical]], self.rrf_k)
+    
+    def _with_keys(self, results: List[Tuple[int, float]], with_ids: bool = False) -> List[tuple]:
+        """``(text, score)`` (or ``(row_id, text, score)``) for ranked row ids, skipping rows deleted meanwhile."""
+        output = []
+        for row_id, score in results:
+            try:
+                text = self.vector_db.get(row_id)[0]
+            except KeyError:
+                continue
+            output.append((row_id, text, score) if with_ids else (text, score))
+        return output
     
     def get_document_info(self) -> dict:
         """Get information about indexed documents."""
-        return self.indexed_documents 
\ No newline at end of file
+        return self.indexed_documents
+
+    def memory_usage(self) -> dict:
+        """Approximate bytes held by the vector and lexical indexes (see ``VectorDatabase.memory_usage``)."""
+        usage = self.vector_db.memory_usage()
+        usage["lexical_bytes"] = self.lexical_index.memory_usage() if self.lexical_index is not None else 0
+        usage["heap_bytes"] += usage["lexical_bytes"]
+        usage["total_bytes"] += usage["lexical_bytes"]
+        return usage
+
+    def save(self, path: str) -> None:
+        """Persist the vector index and document registry to ``path``."""
+        self.vector_db.save(path)
+        documents_path = os.path.join(path, DOCUMENTS_FILENAME)
+        with open(documents_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.indexed_documents, f)
+        os.replace(documents_path + ".tmp", documents_path)
+
+    @classmethod
+    def load(cls, path: str, embedding_model=None, pdf_loader: Optional[PDFLoader] = None, mmap: bool = True) -> "PDFIndexer":
+        """Warm-start an indexer from a directory written by :meth:`save`."""
+        vector_db = VectorDatabase.load(path, embedding_model, mmap=mmap)
+        indexer = cls(vector_db, pdf_loader)
+        # The lexical index is rebuilt from the stored chunk text
+        items = vector_db.items()
+        indexer.lexical_index.add_many([row_id for row_id, _ in items], [key for _, key in items])
+        documents_path = os.path.join(path, DOCUMENTS_FILENAME)
+        if os.path.exists(documents_path):
+            with open(documents_path, "r", encoding="utf-8") as f:
+                indexer.indexed_documents = json.load(f)
+        return indexer 
+
+if __name__ == "__main__":
+    # Page extraction throughput by worker count:
+    #   python -m aimakerspace.pdf_utils report.pdf [max_workers]
+    import sys
+    import time
+    
+    with open(sys.argv[1], "rb") as f:
+        pdf_bytes = f.read()
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    
+    print(f"{'workers':>8} {'pages':>6} {'seconds':>8} {'pages/sec':>10}")
+    worker_counts = sorted({1, *[2 ** i for i in range(1, max_workers.bit_length())], max_workers})
+    for workers in worker_counts:
+        loader = PDFLoader(workers=workers)
+        start = time.perf_counter()
+        pages = sum(1 for _ in loader.iter_pages(pdf_bytes))
+        elapsed = time.perf_counter() - start
+        loader.close()
+        print(f"{workers:>8} {pages:>6} {elapsed:>8.2f} {pages / elapsed:>10.1f}")
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Tuple
+
+from aimakerspace.pdf_utils import PDFIndexer, PDFLoader
+from aimakerspace.vectordatabase import SIDECAR_FILENAME, VectorDatabase
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only exclude threads of this process
+    fcntl = None
+
+# Lock files kept next to the index files. The writer lock is held for a
+# whole update; the files lock only while index files are replaced (exclusive)
+# or read (shared), so readers are never held up by a long-running upload.
+WRITER_LOCK_FILENAME = "writer.lock"
+FILES_LOCK_FILENAME = "files.lock"
+LOCK_FILENAMES = (WRITER_LOCK_FILENAME, FILES_LOCK_FILENAME)
+
+_local_locks: Dict[str, threading.Lock] = {}
+_local_locks_guard = threading.Lock()
+
+
+class _FileLock:
+    """One acquisition of an ``flock`` on ``path``; each instance opens its own descriptor,
+    so instances exclude each other across processes and within one process alike."""
+
+    def __init__(self, path: str, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        self._fd = None
+        self._local = None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if fcntl is None:
+            with _local_locks_guard:
+                self._local = _local_locks.setdefault(self.path, threading.Lock())
+            return self._local.acquire(blocking)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        operation = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        try:
+            fcntl.flock(fd, operation if blocking else operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    async def acquire_async(self, poll_interval: float = 0.05) -> None:
+        """Wait for the lock without blocking the event loop (and without leaking it on cancellation)."""
+        while not self.acquire(blocking=False):
+            await asyncio.sleep(poll_interval)
+
+    def release(self) -> None:
+        if self._local is not None:
+            self._local.release()
+        elif self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "_FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class SharedIndex:
+    """A :class:`PDFIndexer` saved in ``path`` that worker processes on one host share.
+
+    Every process memory-maps the same saved vector file, so the page cache
+    holds one copy of the vectors however many workers serve queries
+    (keys, metadata and the BM25 postings are still per process).
+
+    Updates follow a single-writer protocol:
+
+    - :meth:`write` takes the exclusive writer lock for the whole update,
+      first reloading if another process published a newer version. On
+      success the index is saved and its vectors re-mapped from the saved
+      files, which drops the writer's private copy of them; on failure the
+      in-memory changes are discarded by reloading the published version.
+    - :meth:`refresh` (e.g. before each search) compares the sidecar file's
+      identity with the loaded version, a single ``stat``, and reloads when
+      another process has published since. That reload parses all keys and
+      metadata and rebuilds the BM25 index, so it costs time proportional
+      to the whole index, once per process per published change.
+    - Index files are only replaced under the exclusive files lock and only
+      read under the shared one, so a reader never loads a half-saved index.
+    """
+
+    def __init__(self, path: str, embedding_model=None, pdf_loader: Optional[PDFLoader] = None):
+        self.path = path
+        self.embedding_model = embedding_model
+        self.pdf_loader = pdf_loader
+        os.makedirs(path, exist_ok=True)
+        self._writer_lock_path = os.path.join(path, WRITER_LOCK_FILENAME)
+        self._files_lock_path = os.path.join(path, FILES_LOCK_FILENAME)
+        self._reload_lock = threading.Lock()
+        self.version: Optional[Tuple[int, int, int]] = None
+        self.reloads = 0
+        # Empty until the first refresh() loads the published index
+        self.indexer = self._empty()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, SIDECAR_FILENAME))
+
+    def _empty(self) -> PDFIndexer:
+        return PDFIndexer(VectorDatabase(self.embedding_model), self.pdf_loader)
+
+    def disk_version(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the published sidecar; every save replaces it, so this changes on each publish."""
+        try:
+            stat = os.stat(os.path.join(self.path, SIDECAR_FILENAME))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def is_stale(self) -> bool:
+        return self.disk_version() != self.version
+
+    def refresh(self) -> bool:
+        """Reload if another process has published (or cleared) the index; returns whether it did."""
+        if not self.is_stale():
+            return False
+        return self._reload(force=False)
+
+    def _reload(self, force: bool = True) -> bool:
+        with self._reload_lock:
+            with _FileLock(self._files_lock_path, shared=True):
+                version = self.disk_version()
+                if version == self.version and not force:
+                    return False
+                if version is None:
+                    indexer = self._empty()
+                else:
+                    indexer = PDFIndexer.load(self.path, self.embedding_model, self.pdf_loader)
+            self.indexer, self.version = indexer, version
+            self.reloads += 1
+        return True
+
+    def _publish(self) -> None:
+        with _FileLock(self._files_lock_path):
+            self.indexer.save(self.path)
+            version = self.disk_version()
+        # Re-map the vectors from the saved files so this process shares them
+        # too; its keys, metadata and BM25 index are already up to date. The
+        # writer lock keeps other processes from replacing the files meanwhile
+        try:
+            self.indexer.vector_db.remap(self.path)
+        except ValueError:
+            self._reload()
+            return
+        self.version = version
+
+    @asynccontextmanager
+    async def write(self):
+        """Hold the single-writer lock for one update and yield the up-to-date indexer."""
+        lock = _FileLock(self._writer_lock_path)
+        await lock.acquire_async()
+        try:
+            await asyncio.to_thread(self.refresh)
+            try:
+                yield self.indexer
+            except BaseException:
+                # Forget the unpublished changes
+                await asyncio.to_thread(self._reload)
+                raise
+            await asyncio.to_thread(self._publish)
+        finally:
+            lock.release()
+
+    async def clear(self) -> None:
+        """Remove the published index (other processes see it as empty on their next refresh)."""
+        lock = _FileLock(self._writer_lock_path)
+        await lock.acquire_async()
+        try:
+            await asyncio.to_thread(self._remove_files)
+            await asyncio.to_thread(self.refresh)
+        finally:
+            lock.release()
+
+    def _remove_files(self) -> None:
+        with _FileLock(self._files_lock_path):
+            # The sidecar goes first, so the index is never seen half removed;
+            # the lock files stay, as other processes may be waiting on them
+            sidecar = os.path.join(self.path, SIDECAR_FILENAME)
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            for entry in os.scandir(self.path):
+                if entry.is_file() and entry.name not in LOCK_FILENAMES:
+                    os.remove(entry.path)
@@ -1,12 +1,23 @@
 import os
-from typing import List
+import re
+import mmap
+import codecs
+import hashlib
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 
 class TextFileLoader:
-    def __init__(self, path: str, encoding: str = "utf-8"):
+    def __init__(self, path: str, encoding: str = "utf-8", mmap_threshold: int = 1 << 20):
         self.documents = []
         self.path = path
         self.encoding = encoding
+        # Files at least this large are memory-mapped rather than read
+        self.mmap_threshold = mmap_threshold
 
     def load(self):
         if os.path.isdir(self.path):
@@ -19,41 +30,320 @@ class TextFileLoader:
             )
 
     def load_file(self):
-        with open(self.path, "r", encoding=self.encoding) as f:
-            self.documents.append(f.read())
+        self.documents.append(self.read(self.path))
 
     def load_directory(self):
-        for root, _, files in os.walk(self.path):
-            for file in files:
-                if file.endswith(".txt"):
-                    with open(
-                        os.path.join(root, file), "r", encoding=self.encoding
-                    ) as f:
-                        self.documents.append(f.read())
+        self.documents.extend(text for _, text in self.iter_documents())
 
     def load_documents(self):
         self.load()
         return self.documents
 
+    def iter_paths(self) -> Iterator[str]:
+        """Paths of the ``.txt`` files under ``path`` (or ``path`` itself)."""
+        if os.path.isdir(self.path):
+            for root, _, files in os.walk(self.path):
+                for file in files:
+                    if file.endswith(".txt"):
+                        yield os.path.join(root, file)
+        elif os.path.isfile(self.path) and self.path.endswith(".txt"):
+            yield self.path
+        else:
+            raise ValueError(
+                "Provided path is neither a valid directory nor a .txt file."
+            )
+
+    def read(self, path: str) -> str:
+        """Read one file, decoding large ones straight from a memory map."""
+        if os.path.getsize(path) < self.mmap_threshold:
+            with open(path, "r", encoding=self.encoding) as f:
+                return f.read()
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            with memoryview(mapped) as view:
+                return codecs.decode(view, self.encoding)
+
+    def iter_pieces(self, path: str, piece_size: int = 1 << 20) -> Iterator[str]:
+        """Decode a file ``piece_size`` bytes at a time from a memory map."""
+        if os.path.getsize(path) == 0:
+            return
+        decoder = codecs.getincrementaldecoder(self.encoding)()
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(0, len(mapped), piece_size):
+                piece = decoder.decode(mapped[offset:offset + piece_size])
+                if piece:
+                    yield piece
+            piece = decoder.decode(b"", final=True)
+            if piece:
+                yield piece
+
+    def iter_documents(self, workers: int = 1) -> Iterator[Tuple[str, str]]:
+        """Lazily yield ``(path, text)`` for each file, in :meth:`iter_paths` order.
+
+        With ``workers > 1`` files are read ahead by a thread pool, with at
+        most two files per worker held in memory.
+        """
+        if workers <= 1:
+            for path in self.iter_paths():
+                yield path, self.read(path)
+            return
+        yield from _read_ahead(self.iter_paths(), self.read, workers)
+
+    def iter_chunk_batches(
+        self,
+        splitter: "CharacterTextSplitter",
+        batch_size: int = 256,
+        workers: int = 1,
+    ) -> Iterator[Tuple[List[str], List[dict]]]:
+        """Yield ``(chunks, metadata)`` batches of at most ``batch_size`` chunks.
+
+        Files below ``mmap_threshold`` are read whole (ahead, by ``workers``
+        threads); larger ones are streamed through the splitter piece by
+        piece. Memory stays bounded by the batch size and the read-ahead,
+        whatever the size of the corpus.
+        """
+        def read_small(path):
+            return [self.read(path)] if os.path.getsize(path) < self.mmap_threshold else None
+
+        chunks, metadata = [], []
+        for path, pieces in _read_ahead(self.iter_paths(), read_small, workers):
+            if pieces is None:
+                pieces = self.iter_pieces(path)
+            for chunk_index, (start, chunk) in enumerate(splitter.split_stream(pieces)):
+                chunks.append(chunk)
+                metadata.append({"source": path, "chunk_index": chunk_index, "start": start})
+                if len(chunks) >= batch_size:
+                    yield chunks, metadata
+                    chunks, metadata = [], []
+        if chunks:
+            yield chunks, metadata
+
+
+def _read_ahead(paths: Iterable[str], read, workers: int) -> Iterator[Tuple[str, object]]:
+    """Yield ``(path, read(path))`` in order, reading up to ``2 * workers`` paths ahead."""
+    if workers <= 1:
+        for path in paths:
+            yield path, read(path)
+        return
+    with ThreadPoolExecutor(workers) as executor:
+        pending = deque()
+        for path in paths:
+            pending.append((path, executor.submit(read, path)))
+            if len(pending) >= 2 * workers:
+                path, future = pending.popleft()
+                yield path, future.result()
+        while pending:
+            path, future = pending.popleft()
+            yield path, future.result()
+
+
+class Chunk:
+    """A chunk stored as ``(doc_id, start, end)`` offsets into its document's text.
+
+    The text is only sliced out when :attr:`text` is read, so chunks of a
+    document share its single buffer instead of each holding a copy.
+    Chunks hash and compare equal to their text, so they can be used
+    wherever a chunk string is used as a key.
+    """
+
+    __slots__ = ("document", "doc_id", "start", "end", "_hash")
+
+    def __init__(self, document: str, start: int, end: int, doc_id: Optional[str] = None):
+        self.document = document
+        self.doc_id = doc_id
+        self.start = start
+        self.end = end
+        self._hash = None
+
+    @property
+    def text(self) -> str:
+        return self.document[self.start:self.end]
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"Chunk(doc_id={self.doc_id!r}, start={self.start}, end={self.end})"
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self.text)
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Chunk):
+            if self.document is other.document and self.start == other.start and self.end == other.end:
+                return True
+            return len(self) == len(other) and self.text == other.text
+        if isinstance(other, str):
+            return len(self) == len(other) and self.text == other
+        return NotImplemented
+
+
+# Positions where a new paragraph / sentence starts (after the break's whitespace)
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n\s*")
+_SENTENCE_BREAK = re.compile(r"(?:[.!?][\"')\]]*\s+|\n[ \t]*\n\s*)")
+# About one break in _ANCHOR_EVERY is an anchor, chosen by hashing the
+# _ANCHOR_CONTEXT characters before it
+_ANCHOR_EVERY = 4
+_ANCHOR_CONTEXT = 24
+
 
 class CharacterTextSplitter:
     def __init__(
         self,
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
+        boundary: Optional[str] = None,
     ):
         assert (
             chunk_size > chunk_overlap
         ), "Chunk size must be greater than chunk overlap"
+        assert boundary in (None, "sentence", "paragraph"), "boundary must be None, 'sentence' or 'paragraph'"
 
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        # With a boundary, chunk edges are moved back to the nearest sentence
+        # or paragraph break instead of cutting mid-word
+        self.boundary = boundary
 
     def split(self, text: str) -> List[str]:
-        chunks = []
-        for i in range(0, len(text), self.chunk_size - self.chunk_overlap):
-            chunks.append(text[i : i + self.chunk_size])
-        return chunks
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def split_offsets(self, text: str) -> List[Tuple[int, int]]:
+        """``(start, end)`` offsets of the chunks :meth:`split` returns."""
+        if self.boundary is None:
+            return [
+                (i, min(i + self.chunk_size, len(text)))
+                for i in range(0, len(text), self.chunk_size - self.chunk_overlap)
+            ]
+        return self._split_at_boundaries(text)
+
+    def _split_at_boundaries(self, text: str) -> List[Tuple[int, int]]:
+        return [(start, end) for start, end, _ in self._boundary_chunks([text], with_text=False)]
+
+    def _boundary_chunks(self, pieces: Iterable[str], with_text: bool) -> Iterator[Tuple[int, int, Optional[str]]]:
+        """Boundary-aware ``(start, end, text)`` chunks of text arriving in pieces.
+
+        A chunk ends at the first *anchor* break past half its size, where
+        anchors are breaks picked by a hash of the text just before them;
+        failing that, at its last break. Because anchors depend only on
+        nearby text, an edit shifts chunk edges only until the next anchor,
+        after which the chunks of the old and new text line up again.
+
+        Breaks are found with one regex pass and chunks are cut as soon as
+        the text up to their furthest possible end has arrived, so only the
+        unfinished chunk and the current piece are kept.
+        """
+        if self.boundary == "paragraph":
+            pattern, break_chars = _PARAGRAPH_BREAK, " \t\n\r\f\v"
+        else:
+            pattern, break_chars = _SENTENCE_BREAK, ".!?\"')] \t\n\r\f\v"
+        # A chunk is only shortened to a break if it keeps more than this much,
+        # which also guarantees the next chunk starts after this one does
+        min_size = max(self.chunk_size // 2, self.chunk_overlap)
+        breaks = []  # absolute offsets where a sentence/paragraph starts
+        anchors = []  # whether each break is an anchor
+        buffer, buffer_start, total = "", 0, 0
+        # Breaks are final once followed by other text; scanning resumes at
+        # the trailing run of characters a break could still be made of
+        scan_from, last_break = 0, 0
+        # Chunk starts and ends only move forward, so the pointers sweep the
+        # break positions once
+        start, end_i, start_i, anchor_i = 0, 0, 0, 0
+
+        def scan(final):
+            nonlocal scan_from, last_break
+            for match in pattern.finditer(buffer, scan_from - buffer_start):
+                position = buffer_start + match.end()
+                if position >= total and not final:
+                    break
+                if position > last_break:
+                    context = buffer[max(0, match.start() - _ANCHOR_CONTEXT):match.start() + 1]
+                    breaks.append(position)
+                    anchors.append(zlib.crc32(context.encode("utf-8")) % _ANCHOR_EVERY == 0)
+                    last_break = position
+            if not final:
+                scan_from = max(scan_from, buffer_start + len(buffer.rstrip(break_chars)))
+
+        def cut(final):
+            nonlocal start, end_i, start_i, anchor_i
+            # Drop breaks behind the current chunk
+            behind = min(start_i, anchor_i)
+            if behind > 1024:
+                del breaks[:behind], anchors[:behind]
+                end_i, start_i, anchor_i = end_i - behind, start_i - behind, anchor_i - behind
+            while start < total:
+                limit = start + self.chunk_size
+                if limit >= total:
+                    if final:
+                        yield start, total, buffer[start - buffer_start:] if with_text else None
+                        start = total
+                    return
+                while end_i < len(breaks) and breaks[end_i] <= limit:
+                    end_i += 1
+                while anchor_i < end_i and breaks[anchor_i] <= start + min_size:
+                    anchor_i += 1
+                i = anchor_i
+                while i < end_i and not anchors[i]:
+                    i += 1
+                if i < end_i:
+                    end = breaks[i]
+                elif end_i and breaks[end_i - 1] > start + min_size:
+                    end = breaks[end_i - 1]
+                else:
+                    end = limit
+                yield start, end, buffer[start - buffer_start:end - buffer_start] if with_text else None
+                # Start the overlap at the first break inside it, if any
+                next_start = end - self.chunk_overlap
+                while start_i < len(breaks) and breaks[start_i] < next_start:
+                    start_i += 1
+                if start_i < len(breaks) and breaks[start_i] < end:
+                    next_start = breaks[start_i]
+                start = next_start
+
+        for piece in pieces:
+            # Keep enough text before the scan point to hash anchor context
+            keep_from = max(0, min(start, scan_from - _ANCHOR_CONTEXT))
+            buffer = buffer[keep_from - buffer_start:] + piece
+            buffer_start = keep_from
+            total += len(piece)
+            scan(final=False)
+            yield from cut(final=False)
+        scan(final=True)
+        yield from cut(final=True)
+
+    def split_chunks(self, text: str, doc_id: Optional[str] = None) -> List[Chunk]:
+        """Split ``text`` into :class:`Chunk` offsets that share ``text`` as their buffer."""
+        return [Chunk(text, start, end, doc_id) for start, end in self.split_offsets(text)]
+
+    def split_stream(self, pieces: Iterable[str]) -> Iterator[Tuple[int, str]]:
+        """Split text arriving in pieces (e.g. pages) without materializing it.
+
+        Yields ``(start_offset, chunk)`` pairs identical to :meth:`split` on
+        the concatenated pieces, emitting each chunk as soon as it is
+        complete and keeping at most one chunk plus one piece in memory.
+        """
+        if self.boundary is not None:
+            for start, _, chunk in self._boundary_chunks(pieces, with_text=True):
+                yield start, chunk
+            return
+        step = self.chunk_size - self.chunk_overlap
+        buffer, buffer_start, next_start, total = "", 0, 0, 0
+        for piece in pieces:
+            total += len(piece)
+            buffer = buffer[next_start - buffer_start:] + piece
+            buffer_start = next_start
+            while next_start + self.chunk_size <= total:
+                offset = next_start - buffer_start
+                yield next_start, buffer[offset:offset + self.chunk_size]
+                next_start += step
+        while next_start < total:
+            offset = next_start - buffer_start
+            yield next_start, buffer[offset:offset + self.chunk_size]
+            next_start += step
 
     def split_texts(self, texts: List[str]) -> List[str]:
         chunks = []
@@ -62,6 +352,77 @@ class CharacterTextSplitter:
         return chunks
 
 
+def normalize_chunk(text: str) -> str:
+    """Collapse whitespace so re-flowed copies of a chunk compare equal."""
+    return " ".join(str(text).split())
+
+
+def content_hash(text: str) -> str:
+    """Stable hash of a chunk's normalized text."""
+    return hashlib.sha256(normalize_chunk(text).encode("utf-8")).hexdigest()[:32]
+
+
+class MinHashDeduplicator:
+    """Finds near-duplicate texts with MinHash signatures and LSH banding.
+
+    Texts are shingled into overlapping word n-grams; two texts whose
+    estimated Jaccard similarity reaches ``threshold`` are duplicates.
+    """
+
+    _MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        assert num_perm % bands == 0, "num_perm must be divisible by bands"
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.reset()
+
+    def signature(self, text: str) -> np.ndarray:
+        words = normalize_chunk(text).casefold().split(" ")
+        n = self.shingle_size
+        shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (hashes[:, None] * self._a + self._b) % self._MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def reset(self) -> None:
+        self._buckets: Dict[tuple, object] = {}
+        self._signatures: Dict[object, np.ndarray] = {}
+
+    def add(self, label, text: str) -> Optional[object]:
+        """Register ``text`` under ``label`` unless it near-duplicates an earlier text.
+
+        Returns the earlier text's label for a duplicate (which is then not
+        registered), or ``None`` for a new text.
+        """
+        signature = self.signature(text)
+        rows = self.num_perm // self.bands
+        keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+        for key in keys:
+            other = self._buckets.get(key)
+            if other is not None and np.mean(self._signatures[other] == signature) >= self.threshold:
+                return other
+        self._signatures[label] = signature
+        for key in keys:
+            self._buckets.setdefault(key, label)
+        return None
+
+    def find_duplicates(self, texts: List[str]) -> Dict[int, int]:
+        """Map each near-duplicate's index to the index of the earlier text it duplicates."""
+        self.reset()
+        duplicates = {}
+        for i, text in enumerate(texts):
+            representative = self.add(i, text)
+            if representative is not None:
+                duplicates[i] = representative
+        return duplicates
+
+
 if __name__ == "__main__":
     loader = TextFileLoader("data/KingLear.txt")
     loader.load()
@@ -1,9 +1,27 @@
 import numpy as np
 from collections import defaultdict
-from typing import List, Tuple, Callable
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Callable
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from functools import partial
 import asyncio
+import json
 import os
+import sys
+import threading
+import time
+
+# On-disk layout written by VectorDatabase.save: a raw little-endian float32
+# matrix that can be memory-mapped, plus a JSON sidecar with keys/metadata.
+# Version 2 added stable row ids; version 3 added compressed storage modes,
+# whose codes and quantizer parameters live in separate files.
+INDEX_FORMAT_VERSION = 3
+SUPPORTED_INDEX_FORMAT_VERSIONS = (1, 2, 3)
+VECTORS_FILENAME = "vectors.f32"
+CODES_FILENAME = "codes.bin"
+QUANTIZER_FILENAME = "quantizer.npz"
+SIDECAR_FILENAME = "index.json"
 
 
 def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
@@ -14,20 +32,803 @@ def cosine_similarity(vector_a: np.array, vector_b: np.array) -> float:
     return dot_product / (norm_a * norm_b)
 
 
+def _kmeans(
+    data: np.ndarray,
+    k: int,
+    n_iter: int = 20,
+    rng: np.random.Generator = None,
+    spherical: bool = False,
+) -> np.ndarray:
+    """Lloyd's k-means in pure NumPy; ``spherical`` clusters by cosine similarity."""
+    rng = rng or np.random.default_rng(0)
+    centroids = data[rng.choice(len(data), k, replace=False)].astype(np.float32)
+    for _ in range(n_iter):
+        if spherical:
+            labels = np.argmax(data @ centroids.T, axis=1)
+        else:
+            # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+            labels = np.argmax(data @ centroids.T - 0.5 * (centroids ** 2).sum(axis=1), axis=1)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = counts > 0
+        sums = np.add.reduceat(data[order], starts[nonempty], axis=0)
+        if spherical:
+            centroids[nonempty] = VectorDatabase._normalize(sums)
+        else:
+            centroids[nonempty] = sums / counts[nonempty, None]
+        # Re-seed empty clusters from random points
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class Float16Quantizer:
+    """Half-precision storage: 2 bytes per dimension."""
+
+    storage = "float16"
+    code_dtype = np.float16
+    fitted = True
+    min_training_rows = 0
+    block_size = 65536
+
+    def code_size(self, dim: int) -> int:
+        return dim
+
+    def fit(self, vectors: np.ndarray) -> "Float16Quantizer":
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(np.float16)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def _score_block(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+    def score(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Scores of shape ``(n_queries, n_codes)``, decoding ``block_size`` rows at a time."""
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.block_size):
+            scores[:, start:start + self.block_size] = self._score_block(codes[start:start + self.block_size], queries)
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        pass
+
+
+class Int8Quantizer(Float16Quantizer):
+    """Symmetric scalar quantization to int8 with one scale per dimension."""
+
+    storage = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, min_training_rows: int = 256):
+        self.min_training_rows = min_training_rows
+        self.scales = None
+        self.fitted = False
+
+    def fit(self, vectors: np.ndarray) -> "Int8Quantizer":
+        scales = np.abs(vectors).max(axis=0) / 127.0
+        scales[scales == 0] = 1.0
+        self.scales = scales.astype(np.float32)
+        self.fitted = True
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scales), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scales
+
+    def _score_block(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        # Fold the per-dimension scales into the query instead of decoding rows
+        return (queries * self.scales) @ codes.astype(np.float32).T
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"scales": self.scales}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.scales = state["scales"]
+        self.fitted = True
+
+
+class ProductQuantizer(Float16Quantizer):
+    """Product quantization: ``n_subspaces`` one-byte codes per vector.
+
+    Each subspace gets its own k-means codebook of up to 256 centroids;
+    queries are scored with per-subspace lookup tables (asymmetric distance).
+    """
+
+    storage = "pq"
+    code_dtype = np.uint8
+
+    def __init__(
+        self,
+        n_subspaces: int = None,
+        n_centroids: int = 256,
+        n_iter: int = 15,
+        seed: int = 0,
+        min_training_rows: int = None,
+    ):
+        self.n_subspaces = n_subspaces
+        self.n_centroids = n_centroids
+        # A few training points per centroid by default
+        self.min_training_rows = 4 * n_centroids if min_training_rows is None else min_training_rows
+        self.n_iter = n_iter
+        self.seed = seed
+        self.codebooks = None  # (n_subspaces, n_centroids, subspace_dim)
+        self.fitted = False
+
+    def code_size(self, dim: int) -> int:
+        if self.n_subspaces is None:
+            # Default to 16-dimensional subspaces, e.g. 96 bytes for 1536 dims
+            self.n_subspaces = next(m for m in range(max(1, dim // 16), dim + 1) if dim % m == 0)
+        if dim % self.n_subspaces:
+            raise ValueError(f"Dimension {dim} is not divisible by n_subspaces={self.n_subspaces}")
+        return self.n_subspaces
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.n_subspaces, -1)
+
+    def fit(self, vectors: np.ndarray) -> "ProductQuantizer":
+        self.code_size(vectors.shape[1])
+        rng = np.random.default_rng(self.seed)
+        n_centroids = min(self.n_centroids, len(vectors))
+        sub = self._split(np.asarray(vectors, dtype=np.float32))
+        self.codebooks = np.stack([
+            _kmeans(np.ascontiguousarray(sub[:, m]), n_centroids, self.n_iter, rng)
+            for m in range(self.n_subspaces)
+        ])
+        self.fitted = True
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        sub = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((len(vectors), self.n_subspaces), dtype=np.uint8)
+        for m, codebook in enumerate(self.codebooks):
+            distances = sub[:, m] @ codebook.T - 0.5 * (codebook ** 2).sum(axis=1)
+            codes[:, m] = np.argmax(distances, axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        subspaces = np.arange(self.n_subspaces)
+        return self.codebooks[subspaces, codes.astype(np.int64)].reshape(len(codes), -1)
+
+    def _score_block(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        # tables[q, m, c] = <query subvector m, centroid c of subspace m>
+        tables = np.einsum("qmd,mcd->qmc", self._split(queries), self.codebooks)
+        # One subspace at a time, so no (queries, rows, subspaces) intermediate
+        # is built and memory stays at the size of the scores
+        scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+        for m in range(self.n_subspaces):
+            scores += tables[:, m, codes[:, m]]
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def load_state(self, state: Dict[str, np.ndarray]) -> None:
+        self.codebooks = state["codebooks"]
+        self.n_subspaces = self.codebooks.shape[0]
+        self.fitted = True
+
+
+QUANTIZERS = {
+    "float16": Float16Quantizer,
+    "int8": Int8Quantizer,
+    "pq": ProductQuantizer,
+}
+
+
+def make_quantizer(storage: str, **params):
+    """Quantizer for a storage mode name; ``None`` means plain float32 rows."""
+    if storage == "float32":
+        return None
+    if storage not in QUANTIZERS:
+        raise ValueError(f"Unknown storage mode: {storage}. Must be one of {['float32', *QUANTIZERS]}")
+    return QUANTIZERS[storage](**params)
+
+
+class _ReadWriteLock:
+    """Many concurrent readers or a single (re-entrant) writer.
+
+    A waiting writer holds back new readers, so a steady stream of searches
+    cannot starve it; threads already reading may still nest reads.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self._local = threading.local()  # this thread's read depth
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        depth = getattr(self._local, "depth", 0)
+        with self._cond:
+            while self._writer is not None and self._writer != me or (
+                self._writers_waiting and not depth and self._writer != me
+            ):
+                self._cond.wait()
+            self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+            else:
+                self._writers_waiting += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._writers_waiting -= 1
+                self._writer = me
+                self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if self._writer_depth == 0:
+                    self._writer = None
+                    self._cond.notify_all()
+
+
 class VectorDatabase:
-    def __init__(self, embedding_model: EmbeddingModel = None):
-        self.vectors = defaultdict(np.array)
+    """In-memory vector store backed by one contiguous float32 matrix.
+
+    Rows are L2-normalized on insert so cosine similarity reduces to a dot
+    product, and the matrix grows by amortized doubling so inserts stay O(1).
+
+    Every inserted vector gets a stable integer id. Deletes only tombstone
+    rows; once the tombstoned fraction passes ``compaction_threshold`` a
+    background thread compacts the matrix. Rows always stay in id order, so
+    ids map to rows with a binary search.
+
+    ``storage`` selects how rows are kept: ``"float32"`` (default),
+    ``"float16"``, ``"int8"`` (per-dimension scales) or ``"pq"`` (product
+    quantization). Rows stay float32 until the quantizer's
+    ``min_training_rows`` live rows exist (a quantizer parameter, e.g.
+    ``VectorDatabase(storage="pq", min_training_rows=2048)``); the quantizer
+    is then fitted on all of them and every row is re-encoded, as
+    :meth:`compress` does explicitly. With ``keep_full_precision``
+    a float32 copy is kept as well and the best ``rerank * k`` compressed
+    matches are re-scored exactly.
+
+    The ``a*`` search methods embed with the async client and run scoring on
+    ``search_executor`` (the event loop's default thread pool if ``None``).
+    """
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel = None,
+        initial_capacity: int = 1024,
+        compaction_threshold: float = 0.25,
+        storage: str = "float32",
+        keep_full_precision: bool = False,
+        rerank: int = 4,
+        search_executor: Executor = None,
+        **quantizer_params,
+    ):
         self.embedding_model = embedding_model or EmbeddingModel()
+        self.search_executor = search_executor
+        self.initial_capacity = max(1, initial_capacity)
+        self.compaction_threshold = compaction_threshold
+        self.storage = storage
+        self.quantizer = make_quantizer(storage, **quantizer_params)
+        self.keep_full_precision = keep_full_precision and self.quantizer is not None
+        self.rerank = rerank
+        self.dim = None
+        self._matrix = None  # (capacity, code_size) rows in the storage dtype
+        self._full = None  # (capacity, dim) float32 copy when keep_full_precision
+        self._ids = np.empty(0, dtype=np.int64)  # row -> stable id, ascending
+        self._deleted = np.empty(0, dtype=bool)  # row -> tombstone flag
+        self._size = 0  # rows in use, including tombstones
+        self._epoch = 0  # bumped whenever rows are renumbered or re-encoded
+        self._n_deleted = 0
+        self._next_id = 0
+        self._keys: List[str] = []  # chunk text, or Chunk offsets into a shared document
+        self._metadata: List[dict] = []
+        self._key_to_ids: Dict[str, Set[int]] = defaultdict(set)
+        # metadata field -> value -> ids carrying that value
+        self._inverted: Dict[str, Dict[Any, Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.ann_index: Optional["IVFIndex"] = None
+        self._lock = _ReadWriteLock()
+        self._compaction_thread: Optional[threading.Thread] = None
 
-    def insert(self, key: str, vector: np.array, metadata: dict = None) -> None:
-     self.vectors[key] = (vector, metadata or {})
+    def __len__(self) -> int:
+        return self._size - self._n_deleted
 
-    def search(self, query_vector: np.array, k: int, distance_measure: Callable = cosine_similarity) -> List[Tuple[str, float]]:
-     scores = [
-        (key, distance_measure(query_vector, value[0]))  # value = (embedding, metadata)
-        for key, value in self.vectors.items()
-    ]
-     return sorted(scores, key=lambda x: x[1], reverse=True)[:k]
+    def __contains__(self, key: str) -> bool:
+        return bool(self._key_to_ids.get(key))
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the stored rows (codes when compressed), including tombstoned rows."""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[: self._size]
+
+    @property
+    def _codec(self):
+        """The quantizer the stored rows are encoded with; ``None`` while rows are float32."""
+        return self.quantizer if self.quantizer is not None and self.quantizer.fitted else None
+
+    def _vectors(self, rows: np.ndarray = None) -> np.ndarray:
+        """Float32 vectors for ``rows`` (default: all), decoding codes if needed."""
+        if self._full is not None:
+            return self._full[: self._size] if rows is None else self._full[rows]
+        codes = self.matrix if rows is None else self._matrix[rows]
+        return codes if self._codec is None else self._codec.decode(codes)
+
+    def memory_per_vector(self) -> dict:
+        """Bytes per stored vector for the scanned codes and the optional float32 copy."""
+        code_bytes = (self._codec.code_size(self.dim) * np.dtype(self._codec.code_dtype).itemsize
+                      if self._codec is not None else (self.dim or 0) * 4)
+        full_bytes = (self.dim or 0) * 4 if self._full is not None else 0
+        return {"storage": self.storage, "code_bytes": code_bytes, "full_precision_bytes": full_bytes}
+
+    def memory_usage(self) -> dict:
+        """Approximate bytes held by the index.
+
+        ``mapped_bytes`` are arrays memory-mapped from a saved index, which the
+        OS pages in on demand; ``heap_bytes`` covers in-memory arrays plus the
+        Python objects for keys, metadata and the lookup tables. Chunk keys
+        sharing a document buffer count it once.
+        """
+        with self._lock.read():
+            arrays = [self._matrix, self._full, self._ids, self._deleted]
+            if self.ann_index is not None:
+                arrays += [self.ann_index.centroids, self.ann_index._assignments, *self.ann_index._lists]
+            arrays = [array for array in arrays if array is not None]
+            mapped = sum(array.nbytes for array in arrays if isinstance(array, np.memmap))
+            array_bytes = sum(array.nbytes for array in arrays if not isinstance(array, np.memmap))
+
+            documents = {}
+            key_bytes = sys.getsizeof(self._keys)
+            for key in self._keys:
+                key_bytes += sys.getsizeof(key)
+                document = getattr(key, "document", None)
+                if document is not None:
+                    documents[id(document)] = document
+            key_bytes += sum(sys.getsizeof(document) for document in documents.values())
+            metadata_bytes = sys.getsizeof(self._metadata) + sum(
+                sys.getsizeof(metadata) + sum(map(sys.getsizeof, metadata.values()))
+                for metadata in self._metadata
+            )
+            lookup_bytes = sys.getsizeof(self._key_to_ids) + sum(map(sys.getsizeof, self._key_to_ids.values()))
+            for values in self._inverted.values():
+                lookup_bytes += sys.getsizeof(values) + sum(map(sys.getsizeof, values.values()))
+        heap = array_bytes + key_bytes + metadata_bytes + lookup_bytes
+        return {
+            "rows": len(self),
+            "vector_bytes": array_bytes,
+            "key_bytes": key_bytes,
+            "metadata_bytes": metadata_bytes,
+            "lookup_bytes": lookup_bytes,
+            "heap_bytes": heap,
+            "mapped_bytes": mapped,
+            "total_bytes": heap + mapped,
+        }
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, extra: int) -> None:
+        """Ensure capacity for ``extra`` more rows, doubling as needed."""
+        needed = self._size + extra
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(capacity, self.initial_capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        matrix = self._allocate_codes(new_capacity)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        deleted = np.zeros(new_capacity, dtype=bool)
+        # Quantizers that need no training (float16) never go through
+        # _fit_and_encode, so the float32 copy is started here
+        keep_full = self._full is not None or (self.keep_full_precision and self._codec is not None)
+        full = np.empty((new_capacity, self.dim), dtype=np.float32) if keep_full else None
+        if self._size:
+            matrix[: self._size] = self._matrix[: self._size]
+            ids[: self._size] = self._ids[: self._size]
+            deleted[: self._size] = self._deleted[: self._size]
+            if full is not None:
+                full[: self._size] = self._full[: self._size] if self._full is not None else self._vectors()
+        self._matrix, self._ids, self._deleted, self._full = matrix, ids, deleted, full
+
+    def _allocate_codes(self, capacity: int) -> np.ndarray:
+        if self._codec is None:
+            return np.empty((capacity, self.dim), dtype=np.float32)
+        return np.empty((capacity, self._codec.code_size(self.dim)), dtype=self._codec.code_dtype)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors if self._codec is None else self._codec.encode(vectors)
+
+    def _fit_and_encode(self, vectors: np.ndarray) -> None:
+        """Fit the quantizer on the live rows of ``vectors`` and re-encode every row; callers hold the write lock."""
+        live = ~self._deleted[: self._size]
+        if self.quantizer is not None and live.any():
+            self.quantizer.fit(vectors[live])
+        capacity = self._matrix.shape[0]
+        self._epoch += 1
+        self._matrix = self._allocate_codes(capacity)
+        self._matrix[: self._size] = self._encode(vectors)
+        self._full = None
+        if self.keep_full_precision and self._codec is not None:
+            self._full = np.empty((capacity, self.dim), dtype=np.float32)
+            self._full[: self._size] = vectors
+
+    def _maybe_fit(self) -> None:
+        """Fit a pending quantizer once enough live rows exist to train it."""
+        if self._codec is not None or self.quantizer is None or len(self) < self.quantizer.min_training_rows:
+            return
+        self._fit_and_encode(np.array(self._vectors(), dtype=np.float32))
+
+    def compress(self, storage: str, keep_full_precision: bool = None, **quantizer_params) -> None:
+        """Re-encode every row with a new storage mode, fitting its quantizer on the live rows."""
+        with self._lock.write():
+            vectors = self._vectors() if self._size else None
+            self.storage = storage
+            self.quantizer = make_quantizer(storage, **quantizer_params)
+            if keep_full_precision is not None:
+                self.keep_full_precision = keep_full_precision
+            self.keep_full_precision = self.keep_full_precision and self.quantizer is not None
+            if vectors is None:
+                self._matrix, self._full = None, None
+                self._epoch += 1
+                self._ids, self._deleted = np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+                return
+            self._fit_and_encode(np.array(vectors, dtype=np.float32))
+
+    def insert(self, key: str, vector: np.array, metadata: dict = None) -> int:
+        """Insert one vector and return its stable row id."""
+        return self.insert_many([key], [vector], [metadata or {}])[0]
+
+    def insert_many(self, keys: List[str], vectors, metadata_list: List[dict] = None) -> List[int]:
+        """Insert a batch of vectors with a single normalization pass.
+
+        Every vector gets a new row, even when its key is already present, so
+        identical chunks from different documents keep their own metadata.
+        Keys may be :class:`~aimakerspace.text_utils.Chunk` offsets, which are
+        kept as-is and only turned into text in results. Returns the new row ids.
+        """
+        if len(keys) == 0:
+            return []
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+        vectors = self._normalize(vectors)
+        metadata_list = metadata_list or [{} for _ in keys]
+
+        with self._lock.write():
+            self._reserve(len(keys))
+            start, count = self._size, len(keys)
+            new_ids = np.arange(self._next_id, self._next_id + count, dtype=np.int64)
+            self._matrix[start:start + count] = self._encode(vectors)
+            if self._full is not None:
+                self._full[start:start + count] = vectors
+            self._ids[start:start + count] = new_ids
+            self._deleted[start:start + count] = False
+            for row_id, key, metadata in zip(new_ids.tolist(), keys, metadata_list):
+                self._keys.append(key)
+                self._metadata.append(metadata or {})
+                self._key_to_ids[key].add(row_id)
+                self._index_metadata(row_id, metadata or {})
+            self._size += count
+            self._next_id += count
+            if self.ann_index is not None:
+                self.ann_index.add(np.arange(start, start + count))
+            self._maybe_fit()
+        return new_ids.tolist()
+
+    def _rows_for_ids(self, ids) -> np.ndarray:
+        """Rows currently holding ``ids`` (which must exist)."""
+        return np.searchsorted(self._ids[: self._size], np.asarray(ids, dtype=np.int64))
+
+    def delete(self, ids: List[int]) -> int:
+        """Tombstone the rows with the given ids; returns how many were live."""
+        ids = np.unique(np.asarray(list(ids), dtype=np.int64))
+        if len(ids) == 0:
+            return 0
+        with self._lock.write():
+            rows = self._rows_for_ids(ids)
+            in_range = rows < self._size
+            rows, ids = rows[in_range], ids[in_range]
+            live = (self._ids[rows] == ids) & ~self._deleted[rows]
+            rows, ids = rows[live], ids[live]
+            for row, row_id in zip(rows.tolist(), ids.tolist()):
+                key = self._keys[row]
+                self._key_to_ids[key].discard(row_id)
+                if not self._key_to_ids[key]:
+                    del self._key_to_ids[key]
+                self._unindex_metadata(row_id, self._metadata[row])
+            self._deleted[rows] = True
+            self._n_deleted += len(rows)
+            self.maybe_compact()
+        return len(rows)
+
+    def delete_where(self, filter: Dict[str, Any]) -> int:
+        """Tombstone every row whose metadata matches ``filter``."""
+        with self._lock.write():
+            rows = self._filter_rows(filter)
+            return self.delete(self._ids[rows])
+
+    def maybe_compact(self, background: bool = True) -> bool:
+        """Compact once tombstones exceed ``compaction_threshold`` of the rows.
+
+        By default compaction runs on a daemon thread so deletes return
+        immediately; searches wait for it only while the compacted arrays are
+        swapped in (see :meth:`compact`).
+        """
+        if self._size == 0 or self._n_deleted / self._size < self.compaction_threshold:
+            return False
+        if not background:
+            self.compact()
+            return True
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return False
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+        return True
+
+    def compact(self) -> None:
+        """Drop tombstoned rows, preserving id order.
+
+        The compacted arrays are copied under the read lock, so searches keep
+        running meanwhile; the write lock is only taken to swap them in, after
+        carrying over rows inserted or tombstoned during the copy.
+        """
+        with self._lock.read():
+            if self._n_deleted == 0:
+                return
+            epoch, size = self._epoch, self._size
+            live = ~self._deleted[:size]
+            n_live = int(live.sum())
+            capacity = self.initial_capacity
+            while capacity < n_live:
+                capacity *= 2
+            matrix = self._allocate_codes(capacity)
+            matrix[:n_live] = self._matrix[:size][live]
+            ids = np.empty(capacity, dtype=np.int64)
+            ids[:n_live] = self._ids[:size][live]
+            full = None
+            if self._full is not None:
+                full = np.empty((capacity, self.dim), dtype=np.float32)
+                full[:n_live] = self._full[:size][live]
+
+        with self._lock.write():
+            if self._epoch != epoch:
+                # Rows were re-encoded or compacted meanwhile, so the copy is
+                # stale; compact again while holding the write lock
+                self.compact()
+                return
+            extra = self._size - size
+            if n_live + extra > capacity:
+                while capacity < n_live + extra:
+                    capacity *= 2
+                matrix = np.concatenate((matrix[:n_live], self._allocate_codes(capacity - n_live)))
+                ids = np.concatenate((ids[:n_live], np.empty(capacity - n_live, dtype=np.int64)))
+                if full is not None:
+                    full = np.concatenate((full[:n_live], np.empty((capacity - n_live, self.dim), dtype=np.float32)))
+            new_size = n_live + extra
+            matrix[n_live:new_size] = self._matrix[size:self._size]
+            ids[n_live:new_size] = self._ids[size:self._size]
+            if full is not None:
+                full[n_live:new_size] = self._full[size:self._size]
+            deleted = np.zeros(capacity, dtype=bool)
+            deleted[:n_live] = self._deleted[:size][live]
+            deleted[n_live:new_size] = self._deleted[size:self._size]
+
+            old_to_new = np.full(self._size, -1, dtype=np.int64)
+            old_to_new[np.flatnonzero(live)] = np.arange(n_live)
+            old_to_new[size:] = np.arange(n_live, new_size)
+            kept_rows = np.flatnonzero(old_to_new >= 0).tolist()
+            self._keys = [self._keys[row] for row in kept_rows]
+            self._metadata = [self._metadata[row] for row in kept_rows]
+            self._matrix, self._ids, self._full, self._deleted = matrix, ids, full, deleted
+            self._size, self._n_deleted = new_size, int(deleted.sum())
+            self._epoch += 1
+            if self.ann_index is not None:
+                self.ann_index.remap(old_to_new)
+
+    @staticmethod
+    def _metadata_values(value) -> list:
+        """Indexable values of one metadata field; sequences are indexed per element."""
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        return [v for v in values if isinstance(v, (str, int, float, bool)) or v is None]
+
+    def _index_metadata(self, row_id: int, metadata: dict) -> None:
+        for field, value in metadata.items():
+            for v in self._metadata_values(value):
+                self._inverted[field][v].add(row_id)
+
+    def _unindex_metadata(self, row_id: int, metadata: dict) -> None:
+        for field, value in metadata.items():
+            postings = self._inverted.get(field)
+            if postings is None:
+                continue
+            for v in self._metadata_values(value):
+                ids = postings.get(v)
+                if ids is not None:
+                    ids.discard(row_id)
+                    if not ids:
+                        del postings[v]
+
+    def _filter_ids(self, filter: Dict[str, Any]) -> Set[int]:
+        """Live ids matching every ``field: value`` clause of ``filter``.
+
+        A list, tuple or set value matches any of its members.
+        """
+        matched = None
+        for field, wanted in filter.items():
+            postings = self._inverted.get(field, {})
+            wanted = wanted if isinstance(wanted, (list, tuple, set, frozenset)) else [wanted]
+            ids = set()
+            for value in wanted:
+                ids |= postings.get(value, set())
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return set()
+        return matched if matched is not None else set(self._ids[: self._size][~self._deleted[: self._size]].tolist())
+
+    def _filter_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        """Sorted rows whose metadata matches ``filter``."""
+        ids = self._filter_ids(filter)
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return self._rows_for_ids(np.sort(np.fromiter(ids, dtype=np.int64, count=len(ids))))
+
+    def _score_rows(self, query_vector: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Cosine scores of ``query_vector`` against ``rows`` (default: all rows)."""
+        return self._score_matrix(query_vector, rows)[0]
+
+    def _score_matrix(self, query_vectors: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        """Cosine scores, shape ``(n_queries, n_rows)``, from one matrix-matrix product.
+
+        Compressed storage is scored directly on its codes.
+        """
+        queries = self._normalize(np.atleast_2d(query_vectors))
+        candidates = self.matrix if rows is None else self._matrix[rows]
+        if self._codec is None:
+            return queries @ candidates.T
+        return self._codec.score(candidates, queries)
+
+    def _rerank(self, query_vector: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Re-score a compressed shortlist against the float32 copy and keep the best ``k``."""
+        scores = self._full[rows] @ self._normalize(query_vector).ravel()
+        top = self._top_k(scores, k)
+        return rows[top], scores[top]
+
+    @property
+    def _shortlist_factor(self) -> int:
+        return max(1, self.rerank) if self._full is not None else 1
+
+    @staticmethod
+    def _top_k_per_row(scores: np.ndarray, k: int) -> np.ndarray:
+        """Column indices of the ``k`` best scores in each row, best first."""
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64)
+        if k < scores.shape[1]:
+            candidates = np.argpartition(scores, -k, axis=1)[:, -k:]
+        else:
+            candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1)
+        return np.take_along_axis(candidates, order, axis=1)
+
+    def build_ann_index(self, nlist: int = None, nprobe: int = 8, **kwargs) -> "IVFIndex":
+        """Train an :class:`IVFIndex` over the current rows and route searches through it."""
+        with self._lock.write():
+            self.ann_index = IVFIndex(self, nlist=nlist, nprobe=nprobe, **kwargs).train()
+        return self.ann_index
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the ``k`` highest scores, best first, in O(n + k log k)."""
+        if k <= 0 or scores.size == 0:
+            return np.empty(0, dtype=np.int64)
+        if k < scores.size:
+            candidates = np.argpartition(scores, -k)[-k:]
+        else:
+            candidates = np.arange(scores.size)
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    def _search_rows(
+        self,
+        query_vector: np.ndarray,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        exact: bool = False,
+        filter: Dict[str, Any] = None,
+        rows: np.ndarray = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and scores of the top-``k`` live matches; callers hold the read lock."""
+        if rows is None:
+            if filter:
+                rows = self._filter_rows(filter)
+            elif self.ann_index is not None and not exact and distance_measure is cosine_similarity:
+                rows = self.ann_index.candidates(query_vector)
+        if rows is not None:
+            rows = rows[~self._deleted[rows]]
+        if distance_measure is cosine_similarity:
+            scores = self._score_rows(query_vector, rows)
+        else:
+            # Custom measures fall back to a per-row scan over the stored vectors.
+            scores = np.array([distance_measure(query_vector, row) for row in self._vectors(rows)], dtype=np.float64)
+        if rows is None and self._n_deleted:
+            scores[self._deleted[: self._size]] = -np.inf
+            k = min(k, len(self))
+        rerank = distance_measure is cosine_similarity and self._shortlist_factor > 1
+        top = self._top_k(scores, k * self._shortlist_factor if rerank else k)
+        if rows is None and self._n_deleted:
+            top = top[np.isfinite(scores[top])]
+        top_rows = top if rows is None else rows[top]
+        if rerank:
+            return self._rerank(query_vector, top_rows, k)
+        return top_rows, scores[top]
+
+    def search(
+        self,
+        query_vector: np.array,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        exact: bool = False,
+        filter: Dict[str, Any] = None,
+    ) -> List[Tuple[str, float]]:
+        """Top-``k`` ``(key, score)`` pairs, optionally restricted by a metadata ``filter``.
+
+        With a filter only the matching rows (looked up in the inverted
+        metadata index) are scored, e.g. ``{"document_name": "10-K_2023"}``
+        or ``{"document_name": ["a.pdf", "b.pdf"]}``.
+        """
+        with self._lock.read():
+            if len(self) == 0:
+                return []
+            rows, scores = self._search_rows(query_vector, k, distance_measure, exact, filter)
+            return [(str(self._keys[row]), float(score)) for row, score in zip(rows.tolist(), scores)]
+
+    def search_ids(
+        self,
+        query_vector: np.array,
+        k: int,
+        exact: bool = False,
+        filter: Dict[str, Any] = None,
+    ) -> List[Tuple[int, float]]:
+        """Like :meth:`search` but returns ``(row_id, score)`` pairs."""
+        with self._lock.read():
+            if len(self) == 0:
+                return []
+            rows, scores = self._search_rows(query_vector, k, exact=exact, filter=filter)
+            return [(int(self._ids[row]), float(score)) for row, score in zip(rows.tolist(), scores)]
 
     def search_by_text(
         self,
@@ -35,21 +836,496 @@ class VectorDatabase:
         k: int,
         distance_measure: Callable = cosine_similarity,
         return_as_text: bool = False,
+        filter: Dict[str, Any] = None,
     ) -> List[Tuple[str, float]]:
         query_vector = self.embedding_model.get_embedding(query_text)
-        results = self.search(query_vector, k, distance_measure)
+        results = self.search(query_vector, k, distance_measure, filter=filter)
         return [result[0] for result in results] if return_as_text else results
 
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.search_executor, partial(func, *args, **kwargs))
+
+    async def asearch_ids_by_text(self, query_text: str, k: int, filter: Dict[str, Any] = None) -> List[Tuple[int, float]]:
+        """Non-blocking text search returning ``(row_id, score)`` pairs."""
+        query_vector = await self.embedding_model.async_get_embedding(query_text)
+        return await self._run_in_executor(self.search_ids, query_vector, k, filter=filter)
+
+    async def asearch_by_text(
+        self,
+        query_text: str,
+        k: int,
+        distance_measure: Callable = cosine_similarity,
+        return_as_text: bool = False,
+        filter: Dict[str, Any] = None,
+    ) -> List[Tuple[str, float]]:
+        """Non-blocking :meth:`search_by_text` for use inside an event loop."""
+        query_vector = await self.embedding_model.async_get_embedding(query_text)
+        results = await self._run_in_executor(self.search, query_vector, k, distance_measure, filter=filter)
+        return [result[0] for result in results] if return_as_text else results
+
+    def search_many(
+        self,
+        query_vectors: np.ndarray,
+        k: int,
+        filter: Dict[str, Any] = None,
+        max_block_elements: int = 1 << 24,
+    ) -> List[List[Tuple[str, float]]]:
+        """Exact cosine top-``k`` for many queries at once.
+
+        Queries are scored in blocks with a single matrix-matrix product each
+        (bounded to ``max_block_elements`` scores), followed by a per-row
+        argpartition, so throughput scales with BLAS rather than Python.
+        """
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        with self._lock.read():
+            if len(self) == 0:
+                return [[] for _ in query_vectors]
+            rows = self._filter_rows(filter) if filter else None
+            n_rows = self._size if rows is None else len(rows)
+            if n_rows == 0:
+                return [[] for _ in query_vectors]
+            k = min(k, len(self))
+
+            block = max(1, max_block_elements // n_rows)
+            shortlist = k * self._shortlist_factor
+            results = []
+            for start in range(0, len(query_vectors), block):
+                queries = query_vectors[start:start + block]
+                scores = self._score_matrix(queries, rows)
+                if rows is None and self._n_deleted:
+                    scores[:, self._deleted[: self._size]] = -np.inf
+                top = self._top_k_per_row(scores, shortlist)
+                for query, query_scores, query_top in zip(queries, scores, top):
+                    if rows is None and self._n_deleted:
+                        query_top = query_top[np.isfinite(query_scores[query_top])]
+                    row_ids = query_top if rows is None else rows[query_top]
+                    if shortlist > k:
+                        row_ids, reranked = self._rerank(query, row_ids, k)
+                        results.append([(str(self._keys[row]), float(score)) for row, score in zip(row_ids.tolist(), reranked)])
+                        continue
+                    results.append([
+                        (str(self._keys[row]), float(score))
+                        for row, score in zip(row_ids.tolist(), query_scores[query_top])
+                    ])
+            return results
+
+    async def asearch_many_by_text(
+        self,
+        query_texts: List[str],
+        k: int,
+        return_as_text: bool = False,
+        filter: Dict[str, Any] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Embed all ``query_texts`` in one batched request and score them together."""
+        if not query_texts:
+            return []
+        query_vectors = await self.embedding_model.async_get_embeddings(query_texts)
+        results = await self._run_in_executor(self.search_many, query_vectors, k, filter=filter)
+        if return_as_text:
+            return [[key for key, _ in result] for result in results]
+        return results
+
     def retrieve_from_key(self, key: str) -> Tuple[np.array, dict]:
-     return self.vectors.get(key, (None, {}))
+        """Return the stored (unit-normalized) vector and metadata for ``key``.
+
+        When several rows share the key, the most recently inserted one wins.
+        """
+        with self._lock.read():
+            ids = self._key_to_ids.get(key)
+            if not ids:
+                return (None, {})
+            row = int(self._rows_for_ids([max(ids)])[0])
+            return (self._vectors(np.array([row]))[0], self._metadata[row])
+
+    def get(self, row_id: int) -> Tuple[str, np.array, dict]:
+        """Return ``(key, vector, metadata)`` for a live row id."""
+        with self._lock.read():
+            row = int(self._rows_for_ids([row_id])[0])
+            if row >= self._size or self._ids[row] != row_id or self._deleted[row]:
+                raise KeyError(row_id)
+            return (str(self._keys[row]), self._vectors(np.array([row]))[0], self._metadata[row])
+
+    def get_metadata(self, row_id: int) -> dict:
+        """Metadata of a live row id, without decoding its vector."""
+        with self._lock.read():
+            row = int(self._rows_for_ids([row_id])[0])
+            if row >= self._size or self._ids[row] != row_id or self._deleted[row]:
+                raise KeyError(row_id)
+            return self._metadata[row]
+
+    def update_metadata(self, row_id: int, updates: dict) -> None:
+        """Merge ``updates`` into a live row's metadata, keeping the inverted index in sync."""
+        with self._lock.write():
+            row = int(self._rows_for_ids([row_id])[0])
+            if row >= self._size or self._ids[row] != row_id or self._deleted[row]:
+                raise KeyError(row_id)
+            current = self._metadata[row]
+            if all(field in current and current[field] == value for field, value in updates.items()):
+                return
+            self._unindex_metadata(row_id, self._metadata[row])
+            self._metadata[row] = {**self._metadata[row], **updates}
+            self._index_metadata(row_id, self._metadata[row])
+
+    def update_key(self, row_id: int, key: str) -> None:
+        """Replace a live row's key, e.g. to point a kept chunk at a new version of its document."""
+        with self._lock.write():
+            row = int(self._rows_for_ids([row_id])[0])
+            if row >= self._size or self._ids[row] != row_id or self._deleted[row]:
+                raise KeyError(row_id)
+            old_ids = self._key_to_ids[self._keys[row]]
+            old_ids.discard(row_id)
+            if not old_ids:
+                del self._key_to_ids[self._keys[row]]
+            # Re-insert the entry so the lookup holds the new key object, not an equal old one
+            ids = self._key_to_ids.pop(key, set())
+            ids.add(row_id)
+            self._key_to_ids[key] = ids
+            self._keys[row] = key
+
+    def items(self) -> List[Tuple[int, str]]:
+        """``(row_id, key)`` for every live row, in id order."""
+        with self._lock.read():
+            live = np.flatnonzero(~self._deleted[:self._size])
+            return [(int(self._ids[row]), str(self._keys[row])) for row in live.tolist()]
+
+    def ids_where(self, filter: Dict[str, Any]) -> List[int]:
+        """Sorted live row ids whose metadata matches ``filter``."""
+        with self._lock.read():
+            return sorted(self._filter_ids(filter))
 
     async def abuild_from_list(self, list_of_text: List[str], metadata_list: List[dict] = None) -> "VectorDatabase":
         embeddings = await self.embedding_model.async_get_embeddings(list_of_text)
-        for idx, (text, embedding) in enumerate(zip(list_of_text, embeddings)):
-            metadata = metadata_list[idx] if metadata_list else {}
-            self.insert(text, np.array(embedding), metadata)
+        self.insert_many(list_of_text, embeddings, metadata_list)
+        return self
+
+    async def abuild_from_batches(self, batches: Iterable[Tuple[List[str], List[dict]]]) -> "VectorDatabase":
+        """Embed and insert ``(texts, metadata)`` batches, e.g. from ``TextFileLoader.iter_chunk_batches``.
+
+        The next batch is produced in a worker thread while the current one
+        is embedded, so at most two batches are in memory at a time.
+        """
+        batches = iter(batches)
+        done = object()
+        batch = await asyncio.to_thread(next, batches, done)
+        while batch is not done:
+            upcoming = asyncio.ensure_future(asyncio.to_thread(next, batches, done))
+            try:
+                await self.abuild_from_list(*batch)
+            except BaseException:
+                await asyncio.wait([upcoming])
+                raise
+            batch = await upcoming
+        return self
+
+    def storage_report(
+        self,
+        query_vectors: np.ndarray,
+        k: int = 10,
+        modes: List[str] = ("float32", "float16", "int8", "pq"),
+        rerank: int = 4,
+    ) -> List[dict]:
+        """Memory per vector and recall@k of each storage mode on this index's vectors.
+
+        Recall is measured against exact float32 search, with and without a
+        full-precision re-rank of the ``rerank * k`` shortlist.
+        """
+        with self._lock.read():
+            live = np.flatnonzero(~self._deleted[: self._size])
+            vectors = self._vectors(live)
+        query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        keys = list(range(len(vectors)))
+        reference = VectorDatabase(self.embedding_model)
+        reference.insert_many(keys, vectors)
+        exact = [{key for key, _ in result} for result in reference.search_many(query_vectors, k)]
+
+        def recall(db: "VectorDatabase") -> float:
+            found = db.search_many(query_vectors, k)
+            hits = sum(len(truth & {key for key, _ in result}) for truth, result in zip(exact, found))
+            return hits / max(1, sum(len(truth) for truth in exact))
+
+        report = []
+        for mode in modes:
+            for keep_full in ([False] if mode == "float32" else [False, True]):
+                # Train on every vector, as one batch
+                params = {"min_training_rows": 0} if mode in ("int8", "pq") else {}
+                db = VectorDatabase(
+                    self.embedding_model, storage=mode, keep_full_precision=keep_full, rerank=rerank, **params
+                )
+                db.insert_many(keys, vectors)
+                report.append({**db.memory_per_vector(), "rerank": keep_full, "recall_at_k": recall(db)})
+        return report
+
+    def save(self, path: str) -> None:
+        """Persist the live rows to the directory ``path``.
+
+        Files are written to temporary names and swapped in with ``os.replace``
+        so a concurrent reader never sees a half-written index.
+        """
+        os.makedirs(path, exist_ok=True)
+        sidecar_path = os.path.join(path, SIDECAR_FILENAME)
+        written = []
+
+        def write_array(filename: str, array: np.ndarray) -> None:
+            target = os.path.join(path, filename)
+            with open(target + ".tmp", "wb") as f:
+                f.write(np.ascontiguousarray(array).tobytes())
+            written.append(target)
+
+        with self._lock.read():
+            live = np.flatnonzero(~self._deleted[: self._size])
+            if self._codec is None:
+                write_array(VECTORS_FILENAME, self.matrix[live].astype("<f4"))
+            else:
+                write_array(CODES_FILENAME, self.matrix[live])
+                if self._full is not None:
+                    write_array(VECTORS_FILENAME, self._full[live].astype("<f4"))
+                target = os.path.join(path, QUANTIZER_FILENAME)
+                with open(target + ".tmp", "wb") as f:
+                    np.savez(f, **self._codec.state())
+                written.append(target)
+            live_rows = live.tolist()
+            sidecar = {
+                "format_version": INDEX_FORMAT_VERSION,
+                "dim": self.dim,
+                "count": len(live_rows),
+                "dtype": "float32",
+                "storage": self.storage,
+                "code_size": self.matrix.shape[1] if self._matrix is not None else None,
+                "full_precision": self._full is not None,
+                "keep_full_precision": self.keep_full_precision,
+                "quantized": self._codec is not None,
+                "next_id": self._next_id,
+                "ids": self._ids[live].tolist(),
+                "keys": [str(self._keys[row]) for row in live_rows],
+                "metadata": [self._metadata[row] for row in live_rows],
+            }
+        with open(sidecar_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(sidecar, f, separators=(",", ":"))
+
+        for target in written:
+            os.replace(target + ".tmp", target)
+        os.replace(sidecar_path + ".tmp", sidecar_path)
+
+    def remap(self, path: str) -> None:
+        """Swap the stored rows for memory-maps of the files :meth:`save` just wrote to ``path``.
+
+        Like :meth:`load` with ``mmap=True``, but keys, metadata and lookup
+        tables stay as they are in memory, so the cost does not grow with the
+        text stored. Tombstoned rows are dropped, as ``save`` skipped them.
+        Raises ``ValueError`` if the files do not hold the current live rows.
+        """
+        with self._lock.write():
+            live = ~self._deleted[: self._size]
+            n_live = int(live.sum())
+
+            def map_array(filename: str, dtype, width: int) -> Optional[np.ndarray]:
+                target = os.path.join(path, filename)
+                if os.path.getsize(target) != n_live * width * np.dtype(dtype).itemsize:
+                    raise ValueError(f"{target} does not hold the {n_live} live rows of this index")
+                return np.memmap(target, dtype=dtype, mode="c", shape=(n_live, width)) if n_live else None
+
+            if self._matrix is None:
+                return
+            if self._codec is None:
+                matrix, full = map_array(VECTORS_FILENAME, "<f4", self.dim), None
+            else:
+                matrix = map_array(CODES_FILENAME, self._codec.code_dtype, self._matrix.shape[1])
+                full = map_array(VECTORS_FILENAME, "<f4", self.dim) if self._full is not None else None
+
+            if self._n_deleted:
+                old_to_new = np.full(self._size, -1, dtype=np.int64)
+                old_to_new[live] = np.arange(n_live)
+                live_rows = np.flatnonzero(live).tolist()
+                self._keys = [self._keys[row] for row in live_rows]
+                self._metadata = [self._metadata[row] for row in live_rows]
+                if self.ann_index is not None:
+                    self.ann_index.remap(old_to_new)
+            self._matrix, self._full = matrix, full
+            self._epoch += 1
+            self._ids = self._ids[: self._size][live].copy()
+            self._deleted = np.zeros(n_live, dtype=bool)
+            self._size, self._n_deleted = n_live, 0
+
+    @classmethod
+    def load(cls, path: str, embedding_model: EmbeddingModel = None, mmap: bool = True) -> "VectorDatabase":
+        """Load an index written by :meth:`save`.
+
+        With ``mmap=True`` the vector file is mapped copy-on-write rather than
+        read into RAM; the first insert after loading copies it into a growable
+        in-memory matrix.
+        """
+        with open(os.path.join(path, SIDECAR_FILENAME), "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        version = sidecar.get("format_version")
+        if version not in SUPPORTED_INDEX_FORMAT_VERSIONS:
+            raise ValueError(f"Unsupported index format version: {version}")
+
+        storage = sidecar.get("storage", "float32")
+        # full_precision: vectors.f32 holds a float32 copy next to the codes;
+        # keep_full_precision: start one once a pending quantizer is trained
+        full_precision = sidecar.get("full_precision", False)
+        keep_full_precision = sidecar.get("keep_full_precision", full_precision)
+        db = cls(embedding_model, storage=storage, keep_full_precision=keep_full_precision)
+        count, dim = sidecar["count"], sidecar["dim"]
+        db.dim = dim
+
+        def read_array(filename: str, dtype, width: int) -> np.ndarray:
+            target = os.path.join(path, filename)
+            if mmap:
+                return np.memmap(target, dtype=dtype, mode="c", shape=(count, width))
+            return np.fromfile(target, dtype=dtype).reshape(count, width)
+
+        # Indexes saved before their quantizer had enough rows to train hold float32 vectors
+        if db.quantizer is not None and sidecar.get("quantized", True):
+            with np.load(os.path.join(path, QUANTIZER_FILENAME)) as state:
+                db.quantizer.load_state(dict(state))
+        if count:
+            if db._codec is None:
+                db._matrix = read_array(VECTORS_FILENAME, "<f4", dim)
+            else:
+                db._matrix = read_array(CODES_FILENAME, db._codec.code_dtype, sidecar["code_size"])
+                # Some float16 indexes recorded a float32 copy they never wrote;
+                # _reserve rebuilds it from the codes on the next insert
+                if full_precision and os.path.exists(os.path.join(path, VECTORS_FILENAME)):
+                    db._full = read_array(VECTORS_FILENAME, "<f4", dim)
+        db._size = count
+        db._ids = np.asarray(sidecar.get("ids", range(count)), dtype=np.int64)
+        db._deleted = np.zeros(count, dtype=bool)
+        db._next_id = sidecar.get("next_id", count)
+        db._keys = sidecar["keys"]
+        db._metadata = sidecar["metadata"]
+        for row_id, key, metadata in zip(db._ids.tolist(), db._keys, db._metadata):
+            db._key_to_ids[key].add(row_id)
+            db._index_metadata(row_id, metadata)
+        return db
+
+
+class IVFIndex:
+    """Inverted-file approximate nearest-neighbour index over a VectorDatabase.
+
+    Rows are partitioned into ``nlist`` cells by spherical k-means; a query
+    only scores the rows in its ``nprobe`` closest cells. Raising ``nprobe``
+    trades latency for recall, which :meth:`recall_at_k` and :meth:`tune`
+    measure against the exact scan.
+    """
+
+    def __init__(
+        self,
+        vector_db: VectorDatabase,
+        nlist: int = None,
+        nprobe: int = 8,
+        n_iter: int = 20,
+        max_training_points: int = 256,
+        seed: int = 0,
+    ):
+        self.vector_db = vector_db
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.max_training_points = max_training_points  # per centroid
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self._lists: List[np.ndarray] = []
+        self._assignments = np.empty(0, dtype=np.int64)  # row -> cell, -1 if unassigned
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            block = vectors[start:start + batch_size]
+            labels[start:start + batch_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return labels
+
+    def train(self) -> "IVFIndex":
+        """Run spherical k-means on (a sample of) the stored rows and fill the cells."""
+        n_rows = self.vector_db._size
+        if n_rows == 0:
+            raise ValueError("Cannot train an IVF index on an empty VectorDatabase")
+        nlist = self.nlist or max(1, int(4 * np.sqrt(n_rows)))
+        nlist = min(nlist, n_rows)
+        self.nlist = nlist
+
+        sample_size = min(n_rows, nlist * self.max_training_points)
+        sample_rows = np.sort(self.rng.choice(n_rows, sample_size, replace=False))
+        sample = self.vector_db._vectors(sample_rows)
+        self.centroids = _kmeans(sample, nlist, self.n_iter, self.rng, spherical=True)
+        self._lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        self._assignments = np.empty(0, dtype=np.int64)
+        self.add(np.arange(n_rows))
         return self
 
+    def add(self, rows: np.ndarray) -> None:
+        """Assign (or re-assign) ``rows`` of the vector database to their nearest cell."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.centroids is None or len(rows) == 0:
+            return
+        if len(self._assignments) < self.vector_db._size:
+            grown = np.full(self.vector_db._size, -1, dtype=np.int64)
+            grown[: len(self._assignments)] = self._assignments
+            self._assignments = grown
+
+        previous = self._assignments[rows]
+        for cell in np.unique(previous[previous >= 0]):
+            self._lists[cell] = np.setdiff1d(self._lists[cell], rows[previous == cell])
+
+        labels = self._assign(self.vector_db._vectors(rows))
+        self._assignments[rows] = labels
+        for cell in np.unique(labels):
+            self._lists[cell] = np.concatenate((self._lists[cell], rows[labels == cell]))
+
+    def remap(self, old_to_new: np.ndarray) -> None:
+        """Follow a compaction of the vector database; rows mapped to -1 are dropped."""
+        for cell, rows in enumerate(self._lists):
+            moved = old_to_new[rows]
+            self._lists[cell] = moved[moved >= 0]
+        kept = old_to_new[: len(self._assignments)] >= 0
+        self._assignments = self._assignments[kept]
+
+    def candidates(self, query_vector: np.ndarray, nprobe: int = None) -> np.ndarray:
+        """Row ids stored in the ``nprobe`` cells closest to the query."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        query = VectorDatabase._normalize(query_vector).ravel()
+        cells = VectorDatabase._top_k(self.centroids @ query, nprobe)
+        return np.concatenate([self._lists[cell] for cell in cells])
+
+    def search(self, query_vector: np.ndarray, k: int, nprobe: int = None) -> List[Tuple[str, float]]:
+        db = self.vector_db
+        with db._lock.read():
+            rows, scores = db._search_rows(query_vector, k, rows=self.candidates(query_vector, nprobe))
+            return [(str(db._keys[row]), float(score)) for row, score in zip(rows.tolist(), scores)]
+
+    def recall_at_k(self, query_vectors: np.ndarray, k: int = 10, nprobe: int = None) -> float:
+        """Mean fraction of the exact top-``k`` keys that the IVF search also returns."""
+        hits = 0
+        total = 0
+        for query in np.atleast_2d(query_vectors):
+            exact = {key for key, _ in self.vector_db.search(query, k, exact=True)}
+            approx = {key for key, _ in self.search(query, k, nprobe)}
+            hits += len(exact & approx)
+            total += len(exact)
+        return hits / total if total else 1.0
+
+    def tune(self, query_vectors: np.ndarray, k: int = 10, nprobes: List[int] = (1, 2, 4, 8, 16, 32)) -> List[dict]:
+        """Measure recall@k and mean query latency for each ``nprobe`` setting."""
+        query_vectors = np.atleast_2d(query_vectors)
+        start = time.perf_counter()
+        for query in query_vectors:
+            self.vector_db.search(query, k, exact=True)
+        exact_ms = (time.perf_counter() - start) * 1000 / len(query_vectors)
+
+        report = []
+        for nprobe in nprobes:
+            start = time.perf_counter()
+            for query in query_vectors:
+                self.search(query, k, nprobe)
+            latency_ms = (time.perf_counter() - start) * 1000 / len(query_vectors)
+            report.append({
+                "nprobe": nprobe,
+                "recall_at_k": self.recall_at_k(query_vectors, k, nprobe),
+                "latency_ms": latency_ms,
+                "exact_latency_ms": exact_ms,
+            })
+        return report
 
 
 if __name__ == "__main__":
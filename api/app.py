@@ -1,20 +1,30 @@
 # Import required FastAPI components for building the API
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Header, Response
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 # Import Pydantic for data validation and settings management
 from pydantic import BaseModel
-# Import OpenAI client for interacting with OpenAI's API
-from openai import OpenAI
 import os
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
 import uuid
+import hmac
+import statistics
+import time
+import asyncio
+import numpy as np
 import pandas as pd
 import io
 from docx import Document
 from aimakerspace.pdf_utils import PDFIndexer, PDFLoader
-from aimakerspace.vectordatabase import VectorDatabase
+from aimakerspace.shared_index import SharedIndex
+from aimakerspace.answer_cache import AnswerCache
+from aimakerspace.bm25 import is_keyword_query
+from aimakerspace.vectordatabase import SIDECAR_FILENAME, VectorDatabase
 from aimakerspace.openai_utils.embedding import EmbeddingModel
+# Pooled async OpenAI clients so streaming never blocks the event loop
+from aimakerspace.openai_utils.client_pool import OpenAIClientPool, default_client_pool
 
 # Initialize FastAPI application with a title
 app = FastAPI(title="Financial Document Assistant API")
@@ -34,9 +44,34 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers in requests
 )
 
-# Global variables for document storage (in-memory for this implementation)
-document_indexer = None
-indexed_documents = {}
+# Optional directory each tenant's index is persisted under, so restarts (and
+# evicted tenants) warm-start from disk instead of re-embedding every document
+INDEX_PATH = os.getenv("INDEX_PATH")
+# Memory all tenants' indexes may use together; beyond it the least recently
+# used tenants are evicted (to INDEX_PATH when set, otherwise dropped)
+INDEX_MEMORY_BUDGET_MB = float(os.getenv("INDEX_MEMORY_BUDGET_MB", "1024"))
+# Processes used to extract PDF page text; 1 extracts in a single worker thread
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "1"))
+# Chunk edges snap to sentence breaks so a revised document re-chunks the same
+# way wherever it did not change; set to "none" for fixed-size chunks
+CHUNK_BOUNDARY = os.getenv("CHUNK_BOUNDARY", "sentence")
+# Retrieval for chat: "auto" answers keyword lookups (tickers, line items,
+# figures) from the BM25 index alone and fuses BM25 with embeddings otherwise
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "auto")
+# Uploads indexed concurrently in the background, and how many may wait
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "100"))
+# Completed chat answers are reused for near-identical questions (cosine
+# similarity of at least ANSWER_CACHE_THRESHOLD) that retrieve the same
+# context; ANSWER_CACHE_SIZE=0 disables the cache
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+# Operator token (X-Admin-Token header) for cross-tenant stats; without it
+# /api/tenants/stats only reports the caller's own tenant
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Characters per piece when a cached answer is streamed back
+ANSWER_REPLAY_CHARS = 64
 
 # Define the data models using Pydantic
 class ChatRequest(BaseModel):
@@ -44,6 +79,9 @@ class ChatRequest(BaseModel):
     model: Optional[str] = "gpt-4o-mini"  # Optional model selection with default
     api_key: str          # OpenAI API key for authentication
     analysis_type: Optional[str] = "general"  # Type of financial analysis
+    filter: Optional[Dict[str, Any]] = None  # Restrict retrieval by chunk metadata, e.g. {"document_name": "..."}
+    retrieval_mode: Optional[str] = None  # "dense", "lexical", "hybrid" or "auto"; defaults to RETRIEVAL_MODE
+    use_answer_cache: Optional[bool] = True  # False always asks the model
 
 class DocumentInfo(BaseModel):
     document_name: str
@@ -60,55 +98,90 @@ class FinancialDocumentProcessor:
     def extract_text_from_excel(self, file_bytes: bytes, filename: str) -> str:
         """Extract text from Excel files"""
         try:
-            # Read Excel file
-            df = pd.read_excel(io.BytesIO(file_bytes))
-            
-            # Convert to text representation
-            text_content = []
-            text_content.append(f"Excel Document: {filename}")
-            text_content.append("=" * 50)
-            
-            # Add column headers
-            text_content.append("Column Headers:")
-            text_content.append(", ".join(df.columns.tolist()))
-            text_content.append("")
-            
-            # Add data rows (limit to first 100 rows for performance)
-            text_content.append("Data:")
-            for index, row in df.head(100).iterrows():
-                row_text = ", ".join([f"{col}: {val}" for col, val in row.items() if pd.notna(val)])
-                text_content.append(f"Row {index + 1}: {row_text}")
-            
-            return "\n".join(text_content)
+            return "\n\n".join(chunk for chunk, _ in self.iter_excel_chunks(file_bytes, filename))
         except Exception as e:
             raise ValueError(f"Error processing Excel file: {str(e)}")
     
     def extract_text_from_csv(self, file_bytes: bytes, filename: str) -> str:
         """Extract text from CSV files"""
         try:
-            # Read CSV file
-            df = pd.read_csv(io.BytesIO(file_bytes))
-            
-            # Convert to text representation
-            text_content = []
-            text_content.append(f"CSV Document: {filename}")
-            text_content.append("=" * 50)
-            
-            # Add column headers
-            text_content.append("Column Headers:")
-            text_content.append(", ".join(df.columns.tolist()))
-            text_content.append("")
-            
-            # Add data rows (limit to first 100 rows for performance)
-            text_content.append("Data:")
-            for index, row in df.head(100).iterrows():
-                row_text = ", ".join([f"{col}: {val}" for col, val in row.items() if pd.notna(val)])
-                text_content.append(f"Row {index + 1}: {row_text}")
-            
-            return "\n".join(text_content)
+            return "\n\n".join(chunk for chunk, _ in self.iter_csv_chunks(file_bytes, filename))
         except Exception as e:
             raise ValueError(f"Error processing CSV file: {str(e)}")
     
+    def iter_excel_chunks(self, file_bytes: bytes, filename: str, max_chars: int = 1000) -> Iterator[Tuple[str, dict]]:
+        """Yield one retrieval chunk per group of rows of an Excel sheet (see ``iter_table_chunks``)"""
+        df = pd.read_excel(io.BytesIO(file_bytes))
+        return self.iter_table_chunks([df], f"Excel Document: {filename}", max_chars)
+    
+    def iter_csv_chunks(
+        self,
+        file_bytes: bytes,
+        filename: str,
+        max_chars: int = 1000,
+        block_rows: int = 50_000
+    ) -> Iterator[Tuple[str, dict]]:
+        """Yield one retrieval chunk per group of CSV rows, reading ``block_rows`` rows at a time"""
+        frames = pd.read_csv(io.BytesIO(file_bytes), chunksize=block_rows)
+        return self.iter_table_chunks(frames, f"CSV Document: {filename}", max_chars)
+    
+    def iter_table_chunks(
+        self,
+        frames: Iterable[pd.DataFrame],
+        title: str,
+        max_chars: int = 1000
+    ) -> Iterator[Tuple[str, dict]]:
+        """Format every row as ``Row n: col: value, ...`` and group consecutive rows into chunks
+        
+        Rows are formatted with vectorized string operations a block at a
+        time. Each chunk holds whole rows, roughly ``max_chars`` characters of
+        them, and its metadata records the 1-based ``row_start``/``row_end``.
+        """
+        pending_lines, pending_start, pending_group = [], 1, 0  # rows of the unfinished group
+        next_row, offset = 1, 0
+        for df in frames:
+            if df.empty:
+                continue
+            lines = self._format_rows(df, next_row)
+            lengths = lines.str.len().to_numpy() + 1
+            next_row += len(df)
+            # Group rows by which max_chars-sized stretch of the table text
+            # they start in, so grouping does not depend on the block size
+            groups = (offset + np.cumsum(lengths) - lengths) // max_chars
+            offset += int(lengths.sum())
+            boundaries = np.flatnonzero(np.diff(groups, prepend=pending_group))
+            pending_group = int(groups[-1])
+            lines = lines.tolist()
+            start = 0
+            for end in boundaries.tolist():
+                pending_lines.extend(lines[start:end])
+                if not pending_lines:
+                    continue
+                yield self._table_chunk(title, pending_lines, pending_start)
+                pending_start += len(pending_lines)
+                pending_lines = []
+                start = end
+            pending_lines.extend(lines[start:])
+        if pending_lines:
+            yield self._table_chunk(title, pending_lines, pending_start)
+    
+    @staticmethod
+    def _format_rows(df: pd.DataFrame, first_row: int) -> pd.Series:
+        """``Row n: col: value, ...`` for each row, skipping missing values"""
+        formatted = pd.Series("", index=df.index, dtype=object)
+        for col in df.columns:
+            values = df[col]
+            cells = (f", {col}: " + values.astype(str)).where(values.notna(), "")
+            formatted = formatted + cells
+        numbers = pd.Series(range(first_row, first_row + len(df)), index=df.index).astype(str)
+        return "Row " + numbers + ": " + formatted.str[2:]
+    
+    @staticmethod
+    def _table_chunk(title: str, lines: List[str], row_start: int) -> Tuple[str, dict]:
+        row_end = row_start + len(lines) - 1
+        text = f"{title} (rows {row_start}-{row_end})\n" + "\n".join(lines)
+        return text, {"row_start": row_start, "row_end": row_end}
+    
     def extract_text_from_word(self, file_bytes: bytes, filename: str) -> str:
         """Extract text from Word documents"""
         try:
@@ -136,88 +209,540 @@ class FinancialDocumentProcessor:
         except Exception as e:
             raise ValueError(f"Error processing text file: {str(e)}")
 
-# Initialize the document indexer
-def initialize_indexer(api_key: str = None):
-    global document_indexer
-    if document_indexer is None:
-        from aimakerspace.openai_utils.embedding import EmbeddingModel
-        embedding_model = EmbeddingModel() if api_key is None else EmbeddingModel(api_key=api_key)
-        vector_db = VectorDatabase(embedding_model)
-        pdf_loader = PDFLoader()
-        document_indexer = PDFIndexer(vector_db, pdf_loader)
-    return document_indexer
+class TenantIndex:
+    """One tenant's indexer and usage counters
+    
+    The indexer is either held in memory only or, when persistence is
+    configured, a ``SharedIndex`` that every worker process maps from disk.
+    """
+    
+    def __init__(self, tenant_id: str, indexer: Optional[PDFIndexer] = None, shared: Optional[SharedIndex] = None):
+        self.tenant_id = tenant_id
+        self._indexer = indexer
+        self.shared = shared
+        self.memory: Dict[str, int] = {}  # last PDFIndexer.memory_usage()
+        self.last_used = time.time()
+        self.pins = 0  # requests currently using the index
+        self.searches = 0
+        self.search_latencies = deque(maxlen=1000)  # seconds, most recent searches
+    
+    @property
+    def indexer(self) -> PDFIndexer:
+        return self.shared.indexer if self.shared is not None else self._indexer
+    
+    @property
+    def documents(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "document_name": name,
+                "chunks_created": info["chunks"],
+                "total_text_length": info["total_text_length"],
+                "status": "success"
+            }
+            for name, info in self.indexer.get_document_info().items()
+        }
+    
+    @property
+    def memory_bytes(self) -> int:
+        return self.memory.get("total_bytes", 0)
+    
+    def record_search(self, seconds: float):
+        self.searches += 1
+        self.search_latencies.append(seconds)
+    
+    def stats(self) -> dict:
+        latencies = sorted(self.search_latencies)
+        return {
+            "documents": len(self.documents),
+            "chunks": len(self.indexer.vector_db),
+            "memory": self.memory,
+            "searches": self.searches,
+            "search_latency_ms": {
+                "p50": 1000 * statistics.median(latencies) if latencies else None,
+                "p95": 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+                "max": 1000 * latencies[-1] if latencies else None,
+            },
+            "last_used": self.last_used,
+            "in_use": self.pins > 0,
+            "reloads": self.shared.reloads if self.shared is not None else 0,
+        }
+
+class TenantIndexManager:
+    """Per-tenant document indexes, kept in memory under a shared budget.
+    
+    Tenants are identified by a hash of their OpenAI API key, so each user
+    only sees and searches their own documents and embeds with their own key.
+    When the indexes in memory exceed ``memory_budget`` bytes, the least
+    recently used tenants are evicted: their index stays saved under
+    ``index_path`` and is reloaded on their next request, or is dropped when
+    persistence is not configured. Tenants with a request in progress, and
+    the most recently used tenant, are never evicted.
+    """
+    
+    def __init__(self, memory_budget: int, index_path: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self.index_path = index_path
+        self.pdf_loader = PDFLoader(
+            workers=PDF_EXTRACTION_WORKERS,
+            boundary=None if CHUNK_BOUNDARY == "none" else CHUNK_BOUNDARY
+        )
+        self.tenants: "OrderedDict[str, TenantIndex]" = OrderedDict()  # least recently used first
+        self.evicted_to_disk = 0
+        self.dropped = 0
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+    
+    @staticmethod
+    def tenant_id(api_key: str) -> str:
+        return OpenAIClientPool.key_hash(api_key)[:16]
+    
+    def path(self, tenant_id: str) -> Optional[str]:
+        return os.path.join(self.index_path, tenant_id) if self.index_path else None
+    
+    def adopt_legacy_index(self, api_key: Optional[str]):
+        """Move a single shared index saved directly in ``index_path`` to ``api_key``'s tenant"""
+        if not (self.index_path and api_key and os.path.exists(os.path.join(self.index_path, SIDECAR_FILENAME))):
+            return
+        target = self.path(self.tenant_id(api_key))
+        os.makedirs(target, exist_ok=True)
+        # Every worker runs this on startup: the sidecar moves last, so the
+        # index only appears in the tenant directory once it is complete
+        files = sorted(
+            (entry for entry in os.scandir(self.index_path) if entry.is_file()),
+            key=lambda entry: entry.name == SIDECAR_FILENAME
+        )
+        for entry in files:
+            try:
+                os.replace(entry.path, os.path.join(target, entry.name))
+            except FileNotFoundError:  # moved by another worker
+                pass
+    
+    async def get(self, api_key: str, create: bool = True) -> Optional[TenantIndex]:
+        """The tenant's index, loaded from disk if needed; ``None`` if it has none and not ``create``"""
+        tenant_id = self.tenant_id(api_key)
+        lock = self._load_locks.setdefault(tenant_id, asyncio.Lock())
+        async with lock:
+            tenant = self.tenants.get(tenant_id)
+            if tenant is None:
+                tenant = await asyncio.to_thread(self._open, tenant_id, api_key, create)
+                if tenant is None:
+                    return None
+                self.tenants[tenant_id] = tenant
+            self.tenants.move_to_end(tenant_id)
+            tenant.last_used = time.time()
+        return tenant
+    
+    def _open(self, tenant_id: str, api_key: str, create: bool) -> Optional[TenantIndex]:
+        path = self.path(tenant_id)
+        if not (create or (path is not None and SharedIndex.exists(path))):
+            return None
+        embedding_model = EmbeddingModel(api_key=api_key)
+        if path is not None:
+            # Vectors are memory-mapped from the files all workers share
+            shared = SharedIndex(path, embedding_model, self.pdf_loader)
+            shared.refresh()
+            tenant = TenantIndex(tenant_id, shared=shared)
+        else:
+            tenant = TenantIndex(tenant_id, PDFIndexer(VectorDatabase(embedding_model), self.pdf_loader))
+        tenant.memory = tenant.indexer.memory_usage()
+        return tenant
+    
+    @asynccontextmanager
+    async def use(self, api_key: str, create: bool = True, write: bool = False):
+        """Hold the tenant's index (or ``None``) for one request so it cannot be evicted meanwhile
+        
+        Reads first pick up changes other worker processes have published.
+        With ``write=True`` the request is the tenant's single writer across
+        all workers; its changes are published when the block exits, and
+        other tenants are evicted if the budget is now exceeded.
+        """
+        tenant = await self.get(api_key, create)
+        if tenant is None:
+            yield None
+            return
+        tenant.pins += 1
+        try:
+            if tenant.shared is None:
+                yield tenant
+            elif write:
+                async with tenant.shared.write():
+                    yield tenant
+            else:
+                if tenant.shared.is_stale() and await asyncio.to_thread(tenant.shared.refresh):
+                    tenant.memory = await asyncio.to_thread(tenant.indexer.memory_usage)
+                yield tenant
+        finally:
+            tenant.pins -= 1
+            # Unless the tenant's documents were cleared meanwhile
+            if write and self.tenants.get(tenant.tenant_id) is tenant:
+                tenant.memory = await asyncio.to_thread(tenant.indexer.memory_usage)
+            self.enforce_budget()
+    
+    def memory_bytes(self) -> int:
+        return sum(tenant.memory_bytes for tenant in self.tenants.values())
+    
+    def enforce_budget(self):
+        """Evict least recently used idle tenants until the indexes fit in the budget"""
+        candidates = [tenant for tenant in list(self.tenants.values())[:-1] if tenant.pins == 0]
+        total = self.memory_bytes()
+        for tenant in candidates:
+            if total <= self.memory_budget:
+                break
+            total -= tenant.memory_bytes
+            self.evict(tenant.tenant_id)
+    
+    def evict(self, tenant_id: str):
+        # Every change is saved as it is made, so the copy on disk is current
+        self.tenants.pop(tenant_id)
+        if self.index_path:
+            self.evicted_to_disk += 1
+        else:
+            self.dropped += 1
+    
+    async def delete(self, api_key: str):
+        """Forget the tenant's documents, in memory and on disk (for every worker)"""
+        tenant_id = self.tenant_id(api_key)
+        tenant = self.tenants.pop(tenant_id, None)
+        path = self.path(tenant_id)
+        if path is not None and os.path.exists(path):
+            shared = tenant.shared if tenant is not None else SharedIndex(path, EmbeddingModel(api_key=api_key), self.pdf_loader)
+            await shared.clear()
+    
+    def stats(self, tenant_id: Optional[str] = None) -> dict:
+        """Budget, eviction and per-tenant stats, or only ``tenant_id``'s own entry when given"""
+        if tenant_id is not None:
+            tenant = self.tenants.get(tenant_id)
+            return {"tenants": {tenant_id: tenant.stats()} if tenant is not None else {}}
+        return {
+            "memory_budget_bytes": self.memory_budget,
+            "memory_bytes": self.memory_bytes(),
+            "tenants_in_memory": len(self.tenants),
+            "evicted_to_disk": self.evicted_to_disk,
+            "dropped": self.dropped,
+            "tenants": {tenant_id: tenant.stats() for tenant_id, tenant in self.tenants.items()},
+        }
+
+tenant_indexes = TenantIndexManager(int(INDEX_MEMORY_BUDGET_MB * 1024 * 1024), INDEX_PATH)
+answer_cache = AnswerCache(ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_THRESHOLD)
+
+def _request_api_key(api_key: Optional[str]) -> str:
+    """The caller's API key from the ``X-API-Key`` header; never the server's own key"""
+    if not api_key:
+        raise HTTPException(status_code=401, detail="An OpenAI API key is required (X-API-Key header)")
+    return api_key
+
+def _is_admin(admin_token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN and admin_token) and hmac.compare_digest(admin_token, ADMIN_TOKEN)
+
+@app.on_event("startup")
+async def warm_start_index():
+    # A shared index saved by an earlier single-tenant version belongs to the
+    # server's key; warm-start it up front when that key is configured
+    server_key = os.getenv("OPENAI_API_KEY")
+    tenant_indexes.adopt_legacy_index(server_key)
+    if server_key:
+        await tenant_indexes.get(server_key, create=False)
+
+@app.on_event("shutdown")
+async def close_shared_resources():
+    await default_client_pool.aclose_all()
+    tenant_indexes.pdf_loader.close()
+
+async def ingest_document(
+    file_content: bytes,
+    filename: str,
+    api_key: str,
+    progress: dict,
+    document_name: Optional[str] = None
+) -> dict:
+    """Extract, chunk, embed and index one uploaded file
+    
+    Documents are identified by ``document_name`` (the filename by default).
+    Uploading a document that is already indexed is treated as a new version
+    of it: only chunks that changed are embedded.
+    """
+    processor = FinancialDocumentProcessor()
+    lowered = filename.lower()
+    document_name = document_name or filename
+    
+    # The upload goes into the caller's own index, which is saved and
+    # re-measured against the memory budget afterwards
+    async with tenant_indexes.use(api_key, write=True) as tenant:
+        indexer = tenant.indexer
+        reindexed = document_name in tenant.documents
+        
+        # Process different file types
+        if lowered.endswith('.pdf'):
+            # Pages are parsed off the event loop (in PDF_EXTRACTION_WORKERS
+            # processes when configured) while chunks are embedded
+            result = await indexer.index_pdf(file_content, document_name, progress, reindex=True)
+        elif lowered.endswith(('.csv', '.xlsx', '.xls')):
+            # Spreadsheets are indexed completely, one chunk per group of rows;
+            # CSVs are parsed block by block while earlier rows are embedded
+            max_chars = indexer.pdf_loader.chunk_size
+            if lowered.endswith('.csv'):
+                chunks = processor.iter_csv_chunks(file_content, filename, max_chars)
+            else:
+                chunks = processor.iter_excel_chunks(file_content, filename, max_chars)
+            result = await indexer.index_chunk_stream(chunks, document_name, progress, reindex=True)
+        else:
+            if lowered.endswith(('.docx', '.doc')):
+                extract = processor.extract_text_from_word
+            elif lowered.endswith('.txt'):
+                extract = processor.extract_text_from_txt
+            else:
+                raise ValueError("Unsupported file type. Supported: PDF, Excel, CSV, Word, TXT")
+            text_content = await asyncio.to_thread(extract, file_content, filename)
+            result = await indexer.index_text(text_content, document_name, progress, reindex=True)
+        
+        result["reindexed"] = reindexed
+    # Answers built from the previous version of the document are stale
+    answer_cache.invalidate(tenant.tenant_id, [document_name])
+    return result
+
+class IngestionJobQueue:
+    """In-process queue of upload jobs processed by a fixed pool of async workers.
+    
+    At most ``workers`` uploads are indexed at once and at most ``max_pending``
+    wait behind them, so a burst of uploads cannot starve chat requests.
+    """
+    
+    def __init__(self, workers: int = 2, max_pending: int = 100, max_finished: int = 1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.jobs: Dict[str, dict] = {}
+        self._queue = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._finished: Dict[str, asyncio.Event] = {}  # unfinished job id -> set when it finishes
+    
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_pending)
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.create_task(self._worker()))
+    
+    def submit(self, file_content: bytes, filename: str, api_key: str, document_name: Optional[str] = None) -> dict:
+        """Queue an upload and return its job record; raises ``asyncio.QueueFull`` when saturated."""
+        self._ensure_workers()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "tenant_id": TenantIndexManager.tenant_id(api_key),
+            "filename": filename,
+            "document_name": document_name or filename,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        self._queue.put_nowait((job, file_content, api_key))
+        self.jobs[job["job_id"]] = job
+        self._finished[job["job_id"]] = asyncio.Event()
+        self._prune()
+        return job
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; returns False if it already finished."""
+        job = self.jobs[job_id]
+        if job["status"] == "queued":
+            self._finish(job, "cancelled")
+            return True
+        if job["status"] == "running":
+            self._running[job_id].cancel()
+            return True
+        return False
+    
+    def cancel_all(self, tenant_id: Optional[str] = None) -> None:
+        """Cancel every unfinished job, or only ``tenant_id``'s"""
+        for job_id, job in list(self.jobs.items()):
+            if job["status"] in ("queued", "running") and tenant_id in (None, job["tenant_id"]):
+                self.cancel(job_id)
+    
+    async def wait(self, job_id: str) -> dict:
+        """Wait until a job finishes and return its record."""
+        job = self.jobs[job_id]
+        finished = self._finished.get(job_id)
+        if finished is not None:
+            await finished.wait()
+        return job
+    
+    def stats(self) -> dict:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"workers": self.workers, "max_pending": self.max_pending, "jobs": counts}
+    
+    async def _worker(self):
+        while True:
+            job, file_content, api_key = await self._queue.get()
+            try:
+                if job["status"] != "queued":  # cancelled while waiting
+                    continue
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                task = asyncio.create_task(
+                    ingest_document(file_content, job["filename"], api_key, job["progress"], job["document_name"])
+                )
+                self._running[job["job_id"]] = task
+                try:
+                    result = await task
+                except asyncio.CancelledError:
+                    if not task.cancelled():  # the worker itself is being cancelled
+                        raise
+                    self._finish(job, "cancelled")
+                except Exception as e:
+                    job["error"] = str(e)
+                    self._finish(job, "failed")
+                else:
+                    job["result"] = result
+                    self._finish(job, "completed")
+                finally:
+                    self._running.pop(job["job_id"], None)
+            finally:
+                self._queue.task_done()
+    
+    def _finish(self, job: dict, status: str):
+        job["status"] = status
+        job["finished_at"] = time.time()
+        finished = self._finished.pop(job["job_id"], None)
+        if finished is not None:
+            finished.set()
+    
+    def _prune(self):
+        # Forget the oldest finished jobs once there are too many
+        finished = [job_id for job_id, job in self.jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+ingestion_jobs = IngestionJobQueue(INGESTION_WORKERS, INGESTION_QUEUE_SIZE)
 
 # Define the document upload endpoint
-@app.post("/api/upload-pdf")
+@app.post("/api/upload-pdf", status_code=202)
 async def upload_document(
+    response: Response,
     file: UploadFile = File(...),
-    api_key: str = Form(...)
+    api_key: str = Form(...),
+    wait: bool = Form(False),
+    document_name: Optional[str] = Form(None)
 ):
     try:
         # Read file content
         file_content = await file.read()
-        filename = file.filename.lower()
-        
-        # Initialize processor and indexer
-        processor = FinancialDocumentProcessor()
-        indexer = initialize_indexer(api_key)
         
-        # Process different file types
-        if filename.endswith('.pdf'):
-            # Use existing PDF processing
-            result = await indexer.index_pdf(file_content, f"{file.filename}_{uuid.uuid4().hex[:8]}")
-        elif filename.endswith(('.xlsx', '.xls')):
-            # Process Excel files
-            text_content = processor.extract_text_from_excel(file_content, file.filename)
-            document_name = f"{file.filename}_{uuid.uuid4().hex[:8]}"
-            result = await indexer.index_text(text_content, document_name)
-        elif filename.endswith('.csv'):
-            # Process CSV files
-            text_content = processor.extract_text_from_csv(file_content, file.filename)
-            document_name = f"{file.filename}_{uuid.uuid4().hex[:8]}"
-            result = await indexer.index_text(text_content, document_name)
-        elif filename.endswith(('.docx', '.doc')):
-            # Process Word documents
-            text_content = processor.extract_text_from_word(file_content, file.filename)
-            document_name = f"{file.filename}_{uuid.uuid4().hex[:8]}"
-            result = await indexer.index_text(text_content, document_name)
-        elif filename.endswith('.txt'):
-            # Process text files
-            text_content = processor.extract_text_from_txt(file_content, file.filename)
-            document_name = f"{file.filename}_{uuid.uuid4().hex[:8]}"
-            result = await indexer.index_text(text_content, document_name)
-        else:
+        if not file.filename.lower().endswith(('.pdf', '.xlsx', '.xls', '.csv', '.docx', '.doc', '.txt')):
             raise HTTPException(status_code=400, detail="Unsupported file type. Supported: PDF, Excel, CSV, Word, TXT")
         
-        # Store document info
-        indexed_documents[result["document_name"]] = result
+        # Indexing happens in the background; poll /api/jobs/{job_id} for progress
+        try:
+            job = ingestion_jobs.submit(file_content, file.filename, api_key, document_name)
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Too many uploads in progress, please retry shortly")
         
+        if not wait:
+            return {
+                "message": "Financial document queued for indexing",
+                "job_id": job["job_id"],
+                "document_name": job["document_name"],
+                "status": job["status"]
+            }
+        
+        # Blocking mode for clients that expect the indexing result directly
+        job = await ingestion_jobs.wait(job["job_id"])
+        if job["status"] != "completed":
+            raise HTTPException(status_code=500, detail=job["error"] or f"Indexing {job['status']}")
+        result = job["result"]
+        response.status_code = 200
         return {
             "message": "Financial document uploaded and indexed successfully",
             "document_name": result["document_name"],
             "chunks_created": result["chunks_created"],
+            "chunks_embedded": result["chunks_embedded"],
+            "reindexed": result["reindexed"],
             "total_text_length": result["total_text_length"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Define endpoints to follow and cancel background indexing jobs
+@app.get("/api/jobs")
+async def list_jobs(x_api_key: Optional[str] = Header(None)):
+    tenant_id = TenantIndexManager.tenant_id(_request_api_key(x_api_key))
+    return {
+        "jobs": [job for job in ingestion_jobs.jobs.values() if job["tenant_id"] == tenant_id],
+        "stats": ingestion_jobs.stats()
+    }
+
+def _caller_job(job_id: str, x_api_key: Optional[str]) -> dict:
+    """The job if it belongs to the caller's tenant; other tenants' jobs are reported as missing"""
+    tenant_id = TenantIndexManager.tenant_id(_request_api_key(x_api_key))
+    job = ingestion_jobs.jobs.get(job_id)
+    if job is None or job["tenant_id"] != tenant_id:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, x_api_key: Optional[str] = Header(None)):
+    return _caller_job(job_id, x_api_key)
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str, x_api_key: Optional[str] = Header(None)):
+    _caller_job(job_id, x_api_key)
+    cancelled = ingestion_jobs.cancel(job_id)
+    return {
+        "job_id": job_id,
+        "cancelled": cancelled,
+        "status": ingestion_jobs.jobs[job_id]["status"]
+    }
+
 # Define the chat endpoint with RAG functionality
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
     try:
-        # Initialize OpenAI client with the provided API key
-        client = OpenAI(api_key=request.api_key)
+        # Reuse the pooled client (and its open connections) for this API key
+        client = default_client_pool.get_async(request.api_key)
         
-        # Get relevant context from indexed documents
-        context = ""
-        if document_indexer and indexed_documents:
-            # Search for relevant content
-            relevant_chunks = document_indexer.search_documents(request.user_message, k=3)
-            
-            if relevant_chunks:
-                # Extract text from (text, score) tuples
-                context = "\n\n".join([chunk[0] for chunk in relevant_chunks])
+        # Search the caller's own documents, if they have any
+        mode = request.retrieval_mode or RETRIEVAL_MODE
+        use_cache = answer_cache.enabled and request.use_answer_cache
+        context, context_chunks, documents, question_embedding = "", [], set(), None
+        async with tenant_indexes.use(request.api_key, create=False) as tenant:
+            if tenant is not None and tenant.documents:
+                started = time.perf_counter()
+                relevant_chunks = await tenant.indexer.asearch_documents(
+                    request.user_message,
+                    k=3,
+                    filter=request.filter,
+                    mode=mode,
+                    with_ids=True
+                )
+                tenant.record_search(time.perf_counter() - started)
+                
+                if relevant_chunks:
+                    # Extract text from (row_id, text, score) triples
+                    context = "\n\n".join([chunk[1] for chunk in relevant_chunks])
+                    context_chunks = [(row_id, text) for row_id, text, _ in relevant_chunks]
+                    documents = _source_documents(tenant.indexer, [row_id for row_id, _ in context_chunks])
+                
+                # Match cached answers semantically whenever the search embedded
+                # the question anyway (the embedding comes from its query cache);
+                # keyword lookups only match the same question text
+                if use_cache and (mode in ("dense", "hybrid") or (mode == "auto" and not is_keyword_query(request.user_message))):
+                    question_embedding = await tenant.indexer.vector_db.embedding_model.async_get_embedding(request.user_message)
+        
+        # Answers depend on the analysis type, the model and the exact context
+        tenant_id = TenantIndexManager.tenant_id(request.api_key)
+        cache_key = (tenant_id, request.analysis_type, request.model, AnswerCache.context_hash(context_chunks))
+        if use_cache:
+            cached = answer_cache.get(cache_key, request.user_message, question_embedding)
+            if cached is not None:
+                return StreamingResponse(_replay(cached), media_type="text/plain", headers={"X-Answer-Cache": "hit"})
         
         # Create specialized system message based on analysis type
         system_message = _create_system_message(request.analysis_type, context)
@@ -225,7 +750,7 @@ async def chat(request: ChatRequest):
         # Create an async generator function for streaming responses
         async def generate():
             # Create a streaming chat completion request
-            stream = client.chat.completions.create(
+            stream = await client.chat.completions.create(
                 model=request.model,
                 messages=[
                     {"role": "system", "content": system_message},
@@ -234,18 +759,54 @@ async def chat(request: ChatRequest):
                 stream=True  # Enable streaming response
             )
             
-            # Yield each chunk of the response as it becomes available
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            # Yield each chunk of the response as it becomes available; awaiting
+            # between chunks lets one worker multiplex many concurrent streams
+            parts, finish_reason = [], None
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+                    if chunk.choices and chunk.choices[0].finish_reason is not None:
+                        finish_reason = chunk.choices[0].finish_reason
+            finally:
+                # Release the upstream connection if the client disconnects early
+                await stream.response.aclose()
+            
+            # Only complete answers are reused
+            if use_cache and finish_reason == "stop":
+                answer_cache.put(
+                    cache_key,
+                    request.user_message,
+                    "".join(parts),
+                    embedding=question_embedding,
+                    scope=tenant_id,
+                    documents=documents
+                )
 
         # Return a streaming response to the client
-        return StreamingResponse(generate(), media_type="text/plain")
+        headers = {"X-Answer-Cache": "miss" if use_cache else "bypass"}
+        return StreamingResponse(generate(), media_type="text/plain", headers=headers)
     
     except Exception as e:
         # Handle any errors that occur during processing
         raise HTTPException(status_code=500, detail=str(e))
 
+def _source_documents(indexer: PDFIndexer, row_ids: List[int]) -> set:
+    """Names of the documents the given chunks came from"""
+    documents = set()
+    for row_id in row_ids:
+        try:
+            documents.add(indexer.vector_db.get_metadata(row_id).get("document_name"))
+        except KeyError:  # deleted since the search
+            continue
+    return documents
+
+async def _replay(answer: str):
+    """Stream a cached answer back in pieces, like a live completion"""
+    for start in range(0, len(answer), ANSWER_REPLAY_CHARS):
+        yield answer[start:start + ANSWER_REPLAY_CHARS]
+
 def _create_system_message(analysis_type: str, context: str) -> str:
     """Create specialized system message based on analysis type"""
     
@@ -301,30 +862,65 @@ def _create_system_message(analysis_type: str, context: str) -> str:
 
 # Define endpoint to get document information
 @app.get("/api/documents")
-async def get_documents():
+async def get_documents(x_api_key: Optional[str] = Header(None)):
+    try:
+        async with tenant_indexes.use(_request_api_key(x_api_key), create=False) as tenant:
+            documents = tenant.documents if tenant is not None else {}
+        return {
+            "documents": documents,
+            "total_documents": len(documents)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Define endpoint to remove a single document without rebuilding the index
+@app.delete("/api/documents/{document_name}")
+async def delete_document(document_name: str, x_api_key: Optional[str] = Header(None)):
     try:
+        async with tenant_indexes.use(_request_api_key(x_api_key), create=False, write=True) as tenant:
+            if tenant is None or document_name not in tenant.documents:
+                raise HTTPException(status_code=404, detail=f"Document not found: {document_name}")
+            chunks_removed = tenant.indexer.delete_document(document_name)
+        answer_cache.invalidate(tenant.tenant_id, [document_name])
         return {
-            "documents": indexed_documents,
-            "total_documents": len(indexed_documents)
+            "message": "Financial document removed successfully",
+            "document_name": document_name,
+            "chunks_removed": chunks_removed
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Define endpoint to clear all documents
+# Define endpoint to clear all of the caller's documents
 @app.delete("/api/documents")
-async def clear_documents():
+async def clear_documents(x_api_key: Optional[str] = Header(None)):
     try:
-        global document_indexer, indexed_documents
-        document_indexer = None
-        indexed_documents = {}
+        api_key = _request_api_key(x_api_key)
+        # Jobs still indexing would write into the discarded index
+        ingestion_jobs.cancel_all(TenantIndexManager.tenant_id(api_key))
+        await tenant_indexes.delete(api_key)
+        answer_cache.invalidate(TenantIndexManager.tenant_id(api_key))
         return {"message": "All financial documents cleared successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Per-tenant index memory and search latency: every tenant's for the
+# operator, otherwise only the caller's own
+@app.get("/api/tenants/stats")
+async def tenant_stats(x_api_key: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    if _is_admin(x_admin_token):
+        return tenant_indexes.stats()
+    return tenant_indexes.stats(TenantIndexManager.tenant_id(_request_api_key(x_api_key)))
+
 # Define a health check endpoint to verify API status
 @app.get("/api/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", "openai_clients": default_client_pool.stats(), "answer_cache": answer_cache.stats()}
 
 # Entry point for running the application directly
 if __name__ == "__main__":
@@ -4,8 +4,8 @@ from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 # Import Pydantic for data validation and settings management
 from pydantic import BaseModel
-# Import OpenAI client for interacting with OpenAI's API
-from openai import OpenAI
+# Import the async OpenAI client so streaming never blocks the event loop
+from openai import AsyncOpenAI
 import os
 from typing import Optional
 
@@ -35,12 +35,12 @@ class ChatRequest(BaseModel):
 async def chat(request: ChatRequest):
     try:
         # Initialize OpenAI client with the provided API key
-        client = OpenAI(api_key=request.api_key)
+        client = AsyncOpenAI(api_key=request.api_key)
         
         # Create an async generator function for streaming responses
         async def generate():
             # Create a streaming chat completion request
-            stream = client.chat.completions.create(
+            stream = await client.chat.completions.create(
                 model=request.model,
                 messages=[
                     {"role": "developer", "content": request.developer_message},
@@ -49,10 +49,15 @@ async def chat(request: ChatRequest):
                 stream=True  # Enable streaming response
             )
             
-            # Yield each chunk of the response as it becomes available
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+            # Yield each chunk of the response as it becomes available; awaiting
+            # between chunks lets one worker multiplex many concurrent streams
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Release the upstream connection if the client disconnects early
+                await stream.response.aclose()
 
         # Return a streaming response to the client
         return StreamingResponse(generate(), media_type="text/plain")
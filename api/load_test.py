@@ -0,0 +1,153 @@
+# Load test for concurrent /api/chat streams against a local stand-in for the
+# OpenAI API, comparing the previous synchronous-client handler ("before")
+# with the AsyncOpenAI handler in index.py ("after").
+#
+#   python load_test.py [concurrency] [tokens_per_reply] [seconds_per_token]
+#
+# The stub upstream streams tokens_per_reply tokens, sleeping
+# seconds_per_token between them, in the OpenAI server-sent-event format.
+# Each chat app runs in its own single-worker uvicorn server, and all
+# requests hit the same upstream.
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    """Run ``app`` with uvicorn on a background thread until it is accepting requests"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def stub_upstream(tokens: int, delay: float) -> FastAPI:
+    """Minimal streaming /v1/chat/completions endpoint"""
+    stub = FastAPI()
+
+    @stub.post("/v1/chat/completions")
+    async def completions(body: dict):
+        async def events():
+            for i in range(tokens):
+                await asyncio.sleep(delay)
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": body.get("model", "stub"),
+                    "choices": [{"index": 0, "delta": {"content": f"tok{i} "}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            chunk["choices"] = [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return stub
+
+
+def legacy_app() -> FastAPI:
+    """The chat handler as it was: a sync client iterated inside an async generator"""
+    from openai import OpenAI
+    from index import ChatRequest
+
+    legacy = FastAPI()
+
+    @legacy.post("/api/chat")
+    async def chat(request: ChatRequest):
+        try:
+            client = OpenAI(api_key=request.api_key)
+
+            async def generate():
+                stream = client.chat.completions.create(
+                    model=request.model,
+                    messages=[
+                        {"role": "developer", "content": request.developer_message},
+                        {"role": "user", "content": request.user_message}
+                    ],
+                    stream=True
+                )
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
+
+            return StreamingResponse(generate(), media_type="text/plain")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return legacy
+
+
+async def run_load(url: str, concurrency: int) -> dict:
+    payload = {"developer_message": "You are a test.", "user_message": "Hello", "api_key": "sk-stub"}
+    first_byte: List[float] = []
+    characters = 0
+
+    async def one(client: httpx.AsyncClient):
+        nonlocal characters
+        started = time.perf_counter()
+        async with client.stream("POST", url, json=payload) as response:
+            response.raise_for_status()
+            first = True
+            async for text in response.aiter_text():
+                if first:
+                    first_byte.append(time.perf_counter() - started)
+                    first = False
+                characters += len(text)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[one(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    first_byte.sort()
+    return {
+        "seconds": elapsed,
+        "streams_per_sec": concurrency / elapsed,
+        "chars_per_sec": characters / elapsed,
+        "ttfb_p50": first_byte[len(first_byte) // 2],
+        "ttfb_max": first_byte[-1],
+    }
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    tokens = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+
+    upstream_port = free_port()
+    serve(stub_upstream(tokens, delay), upstream_port)
+    # Both OpenAI clients pick the stub up from the environment
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{upstream_port}/v1"
+
+    from index import app as async_app
+
+    print(f"{concurrency} concurrent streams, {tokens} tokens each, {delay * 1000:.0f} ms/token upstream")
+    print(f"{'handler':>8} {'seconds':>8} {'streams/s':>10} {'chars/s':>10} {'ttfb p50':>9} {'ttfb max':>9}")
+    for name, chat_app in (("before", legacy_app()), ("after", async_app)):
+        port = free_port()
+        server = serve(chat_app, port)
+        result = asyncio.run(run_load(f"http://127.0.0.1:{port}/api/chat", concurrency))
+        server.should_exit = True
+        print(
+            f"{name:>8} {result['seconds']:>8.2f} {result['streams_per_sec']:>10.1f} {result['chars_per_sec']:>10.0f}"
+            f" {result['ttfb_p50']:>9.3f} {result['ttfb_max']:>9.3f}"
+        )
@@ -38,14 +38,20 @@ export default function Home() {
     chatEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   }, [messages, isLoading]);
 
-  // Load documents on component mount
+  // Load the documents indexed under the entered API key
   useEffect(() => {
     loadDocuments();
-  }, []);
+  }, [apiKey]);
 
   const loadDocuments = async () => {
+    if (!apiKey) {
+      setDocuments([]);
+      return;
+    }
     try {
-      const response = await fetch('/api/documents');
+      const response = await fetch('/api/documents', {
+        headers: { 'X-API-Key': apiKey },
+      });
       if (response.ok) {
         const data = await response.json();
         setDocuments(Object.values(data.documents || {}));
@@ -89,6 +95,9 @@ export default function Home() {
       const formData = new FormData();
       formData.append('file', selectedFile);
       formData.append('api_key', apiKey);
+      // Indexing runs as a background job; wait for it so the chunk count
+      // is known and the document list is current when we refresh it
+      formData.append('wait', 'true');
 
       const response = await fetch('/api/upload-pdf', {
         method: 'POST',
@@ -102,7 +111,7 @@ export default function Home() {
         loadDocuments(); // Refresh document list
       } else {
         const errorData = await response.json();
-        alert(`Upload failed: ${errorData.error}`);
+        alert(`Upload failed: ${errorData.detail || errorData.error}`);
       }
     } catch (error) {
       alert('Upload failed. Please try again.');
@@ -117,6 +126,7 @@ export default function Home() {
     try {
       const response = await fetch('/api/documents', {
         method: 'DELETE',
+        headers: { 'X-API-Key': apiKey },
       });
 
       if (response.ok) {
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from aimakerspace.vectordatabase import VECTORS_FILENAME, VectorDatabase
+
+
+class _NoEmbeddings:
+    """Stand-in embedding model; these tests only insert and search vectors."""
+
+
+def _vectors(n: int = 300, dim: int = 32, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_float16_rerank_round_trip(tmp_path, mmap):
+    vectors = _vectors()
+    db = VectorDatabase(_NoEmbeddings(), storage="float16", keep_full_precision=True, initial_capacity=16)
+    db.insert(0, vectors[0])
+    db.insert_many(list(range(1, len(vectors))), vectors[1:])
+
+    assert db.memory_per_vector()["full_precision_bytes"] == 32 * 4
+    assert db._shortlist_factor > 1
+    expected = db.search(vectors[7], 5)
+
+    db.save(str(tmp_path))
+    assert (tmp_path / VECTORS_FILENAME).exists()
+    loaded = VectorDatabase.load(str(tmp_path), _NoEmbeddings(), mmap=mmap)
+
+    assert loaded.memory_per_vector()["full_precision_bytes"] == 32 * 4
+    assert loaded.search(vectors[7], 5) == expected
+    np.testing.assert_array_equal(loaded._full[: len(vectors)], db._full[: len(vectors)])
+
+
+def test_untrained_quantizer_round_trip_keeps_full_precision(tmp_path):
+    vectors = _vectors()
+    db = VectorDatabase(_NoEmbeddings(), storage="int8", keep_full_precision=True, min_training_rows=100)
+    db.insert_many(list(range(50)), vectors[:50])
+    db.save(str(tmp_path))
+
+    loaded = VectorDatabase.load(str(tmp_path), _NoEmbeddings())
+    assert loaded._codec is None and loaded._full is None
+    loaded.insert_many(list(range(50, len(vectors))), vectors[50:])
+
+    assert loaded._codec is not None
+    assert loaded.memory_per_vector()["full_precision_bytes"] == 32 * 4
+    assert loaded.search(vectors[60], 1)[0][0] == "60"